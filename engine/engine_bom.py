@@ -14,10 +14,12 @@ Run:
 - Remap ดัชนีวัน: ถ้า JSON ใช้ 0=Sunday จะ map เป็น Python weekday() 0=Monday ให้เอง
 """
 
-import math, json, random, argparse
-from dataclasses import dataclass
+import math, json, argparse, heapq, os, sys, functools, bisect, threading
+import numpy as np
+from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional, Any
-from collections import defaultdict, namedtuple
+from collections import defaultdict, namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 
 # =========================
@@ -103,49 +105,149 @@ def parse_hhmm_to_min(s: str) -> int:
     hh, mm = s.split(":")
     return int(hh)*60 + int(mm)
 
-def working_blocks_for_day(day0: date, idx: int, cal: CalendarConfig) -> List[ShiftBlock]:
-    wd = (day0 + timedelta(days=idx)).weekday()  # Python: Monday=0
-    if cal.treat_weekend_as_off and wd in (5,6):
-        return []
-    dstr = (day0 + timedelta(days=idx)).isoformat()
-    if dstr in set(cal.holidays):
-        return []
-    return cal.weekday_blocks.get(wd, [])
-
-def align_to_working(day0: date, t: int, cal: CalendarConfig) -> int:
-    while True:
-        day_idx = t // MINUTES_PER_DAY
-        minute_in_day = t % MINUTES_PER_DAY
-        blocks = working_blocks_for_day(day0, day_idx, cal)
-        moved = False
-        for b in blocks:
-            if minute_in_day < b.start_min:
-                t = day_idx*MINUTES_PER_DAY + b.start_min
-                moved = True; break
-            if b.start_min <= minute_in_day < b.end_min:
-                return t
-        if moved:
+@dataclass
+class WorkTimeline:
+    """
+    ช่วงเวลาทำงานแบบ absolute minute (นับจาก day0 00:00) ที่คำนวณล่วงหน้าครั้งเดียวต่อ GA run
+    - work_starts / work_ends : ขอบของ block ทำงานเรียงตามเวลา
+    - cum_work[i]             : จำนวนนาทีทำงานสะสมก่อนถึง work_starts[i]
+    - day_ptr[d]              : block ของวัน d คือ index day_ptr[d]..day_ptr[d+1]-1
+    align/add ใช้ binary search บนขอบ block แทนการวนทีละวันใน Python; ถ้าเกิน horizon จะขยายให้เอง
+    ใช้ร่วมกันหลาย thread ได้: การขยายทำใต้ lock แล้วสลับ _view ทั้งชุดในครั้งเดียว ผู้อ่านจับ _view ครั้งเดียวต่อ call
+    """
+    day0: date
+    cal: CalendarConfig
+    horizon_days: int
+    work_starts: np.ndarray
+    work_ends: np.ndarray
+    cum_work: np.ndarray
+    cum_end: np.ndarray
+    day_ptr: np.ndarray = None
+    day_blocks: List[List[Tuple[int, int]]] = None   # (start,end) นาทีในวัน ต่อวัน (วันหยุด/เสาร์-อาทิตย์ที่ปิด = [])
+    baseline: int = 0                                 # align(0) คงที่ตลอด GA run
+    # (starts, ends, cum_work, cum_end, day_blocks) แบบ list ของ int สำหรับ lookup ทีละค่าด้วย bisect
+    # (ไม่มี overhead ของ ufunc dispatch) — ทั้งชุดมาจาก _fill ครั้งเดียวกันเสมอ
+    _view: Tuple = field(default=None, repr=False)
+    _lock: Any = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __getstate__(self):
+        # lock pickle ไม่ได้ (ส่ง timeline ให้ process worker) — สร้างใหม่ฝั่งปลายทาง
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build(day0: date, cal: CalendarConfig, horizon_days: int) -> "WorkTimeline":
+        if not any(cal.weekday_blocks.get(wd) for wd in range(7)
+                   if not (cal.treat_weekend_as_off and wd in (5,6))):
+            raise ValueError("Calendar has no working blocks; cannot schedule.")
+        tl = WorkTimeline(day0, cal, 0, *(np.zeros(0, dtype=np.int64) for _ in range(4)))
+        tl._fill(max(1, int(horizon_days)))
+        tl.baseline = tl.align(0)
+        return tl
+
+    def _fill(self, horizon_days: int):
+        cal = self.cal
+        holidays = set(cal.holidays)
+        week = {wd: sorted(((b.start_min, b.end_min) for b in cal.weekday_blocks.get(wd, [])))
+                for wd in range(7)}
+        wd0 = self.day0.weekday()
+        starts: List[int] = []; ends: List[int] = []
+        day_ptr = [0]*(horizon_days+1)
+        day_blocks: List[List[Tuple[int, int]]] = []
+        for idx in range(horizon_days):
+            wd = (wd0 + idx) % 7
+            if (cal.treat_weekend_as_off and wd in (5,6)) or \
+               (holidays and (self.day0 + timedelta(days=idx)).isoformat() in holidays):
+                blocks = []
+            else:
+                blocks = week[wd]
+            off = idx*MINUTES_PER_DAY
+            for bs, be in blocks:
+                starts.append(off + bs); ends.append(off + be)
+            day_ptr[idx+1] = len(starts)
+            day_blocks.append(blocks)
+        work_starts = np.asarray(starts, dtype=np.int64)
+        work_ends = np.asarray(ends, dtype=np.int64)
+        lens = work_ends - work_starts
+        cum_end = np.cumsum(lens)
+        cum_work = cum_end - lens
+        self.day_ptr = np.asarray(day_ptr, dtype=np.int64)
+        self.day_blocks = day_blocks
+        self.horizon_days = horizon_days
+        self.work_starts, self.work_ends = work_starts, work_ends
+        self.cum_end, self.cum_work = cum_end, cum_work
+        # สลับทีละชุดเป็น assignment เดียว — ผู้อ่านที่ถือ view เก่าไว้ยังได้ list ที่ยาวเท่ากันทุกตัว
+        self._view = (starts, ends, cum_work.tolist(), cum_end.tolist(), day_blocks)
+
+    def _grow(self, seen: Tuple) -> Tuple:
+        """ขยาย horizon เป็น 2 เท่า ถ้ายังไม่มี thread อื่นขยายไปก่อน (seen = view ที่ผู้เรียกถืออยู่); คืน view ล่าสุด
+           ช่วงต้นของ view ใหม่ตรงกับของเก่าทุกค่า จึงใช้ index ที่หาได้จาก view เก่าต่อได้
+        """
+        with self._lock:
+            if self._view is seen:
+                self._fill(self.horizon_days * 2)
+            return self._view
+
+    def working_at(self, t: int) -> int:
+        """จำนวนนาทีทำงานสะสมตั้งแต่ต้น horizon จนถึงเวลา t"""
+        v = self._view
+        while t > v[1][-1]:
+            v = self._grow(v)
+        starts, ends, cum_work = v[0], v[1], v[2]
+        i = bisect.bisect_right(starts, t) - 1
+        if i < 0:
+            return 0
+        s0 = starts[i]
+        return cum_work[i] + min(t - s0, ends[i] - s0)
+
+    def working_between(self, a: int, b: int) -> int:
+        return max(0, self.working_at(b) - self.working_at(a))
+
+    def blocks_for_day(self, idx: int) -> List[Tuple[int, int]]:
+        v = self._view
+        while idx >= len(v[4]):
+            v = self._grow(v)
+        return v[4][idx]
+
+    def align(self, t: int) -> int:
+        v = self._view
+        i = bisect.bisect_right(v[1], t)
+        while i >= len(v[1]):
+            v = self._grow(v); i = bisect.bisect_right(v[1], t)
+        s0 = v[0][i]
+        return t if t > s0 else s0
+
+    def add(self, start: int, dur: int) -> int:
+        v = self._view
+        i = bisect.bisect_right(v[1], start)
+        while i >= len(v[1]):
+            v = self._grow(v); i = bisect.bisect_right(v[1], start)
+        starts, _, cum_work, cum_end, _ = v
+        s0 = starts[i]
+        t = start if start > s0 else s0   # align(start); block i ยังเป็น block ของ t
+        if dur <= 0:
             return t
-        t = (day_idx+1)*MINUTES_PER_DAY
-
-def add_working_minutes(day0: date, start: int, dur: int, cal: CalendarConfig) -> int:
-    t = align_to_working(day0, start, cal)
-    r = dur
-    while r > 0:
-        day_idx = t // MINUTES_PER_DAY
-        minute_in_day = t % MINUTES_PER_DAY
-        blocks = working_blocks_for_day(day0, day_idx, cal)
-        block_end = None
-        for b in blocks:
-            if b.start_min <= minute_in_day < b.end_min:
-                block_end = b.end_min; break
-        if block_end is None:
-            t = align_to_working(day0, t, cal); continue
-        can = min(r, block_end - minute_in_day)
-        t += can; r -= can
-        if r > 0:
-            t = align_to_working(day0, day_idx*MINUTES_PER_DAY + block_end, cal)
-    return t
+        w = cum_work[i] + (t - s0) + dur
+        j = bisect.bisect_left(cum_end, w)
+        while j >= len(cum_end):
+            v = self._grow(v); starts, _, cum_work, cum_end, _ = v
+            j = bisect.bisect_left(cum_end, w)
+        return starts[j] + (w - cum_work[j])
+
+def estimate_horizon_days(tasks, cal: CalendarConfig) -> int:
+    """ประมาณจำนวนวันของ horizon จากงานทั้งหมดถ้าทำต่อกันบนเครื่องเดียว (ขยายเพิ่มเองได้ภายหลัง)"""
+    week_min = sum(b.end_min - b.start_min for wd in range(7)
+                   if not (cal.treat_weekend_as_off and wd in (5,6))
+                   for b in cal.weekday_blocks.get(wd, []))
+    total = sum(t.duration_min for t in tasks)
+    if week_min <= 0:
+        return 14
+    return max(14, math.ceil(total / week_min * 7) + 7)
 
 # =========================
 # GA core
@@ -164,52 +266,49 @@ class GAConfig:
     w_setup: float = 0.3
     w_makespan: float = 0.2
     seed: int = 123
+    n_workers: Optional[int] = None   # None = os.cpu_count(), 1 = ไม่ใช้ process pool
 
-def init_population(rng: random.Random, tasks: List[Task], cfg: GAConfig) -> List[Chromosome]:
-    n = len(tasks)
+def init_population(rng: np.random.Generator, ta: "TaskArrays", cfg: GAConfig) -> List[Chromosome]:
+    # perm/mach_assign เป็น np.int32; mach_assign[tid] = machine id (index ใน ta.machine_names)
+    n = ta.n
+    starts = ta.compat_indptr[:-1]
+    counts = np.diff(ta.compat_indptr)
     pop = []
     for _ in range(cfg.pop_size):
-        perm = list(range(n)); rng.shuffle(perm)
-        mach = [rng.choice(tasks[i].compatible_machines) for i in range(n)]
+        perm = rng.permutation(n).astype(np.int32)
+        mach = ta.compat_idx[starts + rng.integers(0, counts)]
         pop.append(Chromosome(perm, mach))
     return pop
 
-def tournament_select(rng, population, fitnesses, k):
-    idxs = rng.sample(range(len(population)), k)
-    best = min(idxs, key=lambda i: fitnesses[i])
-    return population[best]
-
 def ox_crossover(rng, a: Chromosome, b: Chromosome):
     n=len(a.perm)
     if n<2: return a,b
-    i,j=sorted(rng.sample(range(n),2))
+    i,j=sorted(rng.choice(n, 2, replace=False))
+    # ตำแหน่งนอกช่วง [i,j] ใช้ร่วมกันทั้งสองลูก; present = bitmap ของยีนที่อยู่ในช่วงของ p1 แล้ว
+    outside=np.ones(n, dtype=bool); outside[i:j+1]=False
     def ox(p1,p2):
-        child=[None]*n; child[i:j+1]=p1.perm[i:j+1]
-        p2items=[x for x in p2.perm if x not in child]
-        ptr=0
-        for idx in list(range(0,i))+list(range(j+1,n)):
-            child[idx]=p2items[ptr]; ptr+=1
-        mach=[p1.mach_assign[k] if rng.random()<0.5 else p2.mach_assign[k] for k in range(n)]
+        child=p1.perm.copy()
+        present=np.zeros(n, dtype=bool); present[p1.perm[i:j+1]]=True
+        child[outside]=p2.perm[~present[p2.perm]]
+        mach=np.where(rng.random(n)<0.5, p1.mach_assign, p2.mach_assign)
         return Chromosome(child, mach)
     return ox(a,b), ox(b,a)
 
-def mutate(rng, ch: Chromosome, tasks: List[Task], rate: float):
-    perm=ch.perm[:]; mach=ch.mach_assign[:]; n=len(perm)
-    if rng.random()<rate:
-        i,j=rng.sample(range(n),2); perm[i],perm[j]=perm[j],perm[i]
-    if rng.random()<rate:
-        k=rng.randrange(n); t=tasks[perm[k]]
-        mach[perm[k]] = random.choice(t.compatible_machines)
+def apply_mutation(ch: Chromosome, ta: "TaskArrays", swap: bool, i: int, j: int, remach: bool, k: int, u: float):
+    # ใช้ค่าสุ่มที่ดึงมาแล้ว: swap perm[i]<->perm[j], เปลี่ยนเครื่องของ task ที่ตำแหน่ง k ด้วย u ใน [0,1)
+    if not (swap or remach):
+        return ch
+    perm=ch.perm; mach=ch.mach_assign
+    if swap:
+        perm=perm.copy(); perm[i],perm[j]=perm[j],perm[i]
+    if remach:
+        tid=perm[k]; opts=ta.compat[tid]
+        mach=mach.copy(); mach[tid]=opts[int(u*len(opts))]
     return Chromosome(perm,mach)
 
 # =========================
 # Setup & Speed helpers
 # =========================
-def get_setup(setup_sd: Dict[Tuple[str,str,str], int], machine: str, last_proc: Optional[str], next_proc: str) -> int:
-    if last_proc is None or last_proc == next_proc:
-        return 0
-    return setup_sd.get((machine, last_proc, next_proc), 0)
-
 def get_speed(speed: Dict[Tuple, float], machine: str, product: str, process: str) -> float:
     return speed.get((machine, product, process)) or speed.get((machine, process)) or 1.0
 
@@ -270,99 +369,230 @@ def build_tasks_with_bom(process_defs, product_defs, orders_single, orders_multi
 
     return tasks, extra_preds, product_last_idx_by_tag, order_due_working_by_tag, order_due_date_by_tag
 
+# =========================
+# Int-encoded task table (decoder input)
+# =========================
+@dataclass
+class TaskArrays:
+    """ข้อมูล task แบบ int id ล้วน สร้างครั้งเดียวต่อการรัน GA
+
+    string (machine/process/product/tag) ถูกแปลงเป็น index ทั้งหมด,
+    extra_preds เก็บแบบ CSR: pred ของ tid คือ pred_indices[pred_indptr[tid]:pred_indptr[tid+1]]
+    """
+    n: int
+    machine_names: List[str]
+    machine_id: Dict[str, int]
+    process_names: List[str]
+    product_names: List[str]
+    tag_names: List[str]
+    order_ids: List[str]
+    duration: List[int]
+    idx_in_flow: List[int]
+    process: List[int]
+    product: List[int]
+    tag: List[int]
+    compat: List[List[int]]
+    compat_indptr: np.ndarray     # machine id ที่ใช้ได้ของ tid = compat_idx[compat_indptr[tid]:compat_indptr[tid+1]]
+    compat_idx: np.ndarray
+    is_compat: List[List[bool]]   # [tid][machine id] ตรวจ O(1) ใน decoder
+    # ตาราง dense แทน dict tuple-key: setup_tbl[m][last_proc][next_proc], proc_time[tid][m] (นาทีหลังคิด speed แล้ว)
+    # เก็บเป็น nested list เพราะ decoder อ่านทีละค่า (index list เร็วกว่า index ndarray ทีละตัว)
+    setup_tbl: List[List[List[int]]]
+    proc_time: List[List[int]]
+    flow_pred: List[int]          # task ก่อนหน้าใน flow เดียวกัน (-1 = ไม่มี)
+    pred_indptr: List[int]
+    pred_indices: List[int]
+    pred_count: List[int]         # จำนวน predecessor ทั้งหมด (flow + BOM)
+    succ_indptr: List[int]        # successor แบบ CSR (flow successor + BOM gate)
+    succ_indices: List[int]
+
+def _intern(names: List[str], index: Dict[str, int], key: str) -> int:
+    i = index.get(key)
+    if i is None:
+        i = index[key] = len(names); names.append(key)
+    return i
+
+def encode_tasks(tasks: List[Task], machines, extra_preds, setup_sd=None, speed=None) -> TaskArrays:
+    machine_names = list(machines.keys())
+    machine_id = {m: i for i, m in enumerate(machine_names)}
+    process_names: List[str] = []; process_index: Dict[str, int] = {}
+    product_names: List[str] = []; product_index: Dict[str, int] = {}
+    tag_names: List[str] = []; tag_index: Dict[str, int] = {}
+
+    n = len(tasks)
+    process = [0]*n; product = [0]*n; tag = [0]*n
+    compat: List[List[int]] = [[] for _ in range(n)]
+    flow_pred = [-1]*n
+    pos_by_flow: Dict[Tuple[int, int], int] = {}
+    for t in tasks:
+        i = t.task_id
+        if i != len(pos_by_flow):
+            raise ValueError("task_id must be contiguous 0..n-1 in build order")
+        process[i] = _intern(process_names, process_index, t.process)
+        product[i] = _intern(product_names, product_index, t.product)
+        tag[i] = _intern(tag_names, tag_index, t.tag)
+        for m in t.compatible_machines:
+            if m not in machine_id:
+                raise ValueError(f"Task {i} ({t.process}) uses unknown machine '{m}'")
+            compat[i].append(machine_id[m])
+        pos_by_flow[(tag[i], t.idx_in_flow)] = i
+    for t in tasks:
+        if t.idx_in_flow > 0:
+            flow_pred[t.task_id] = pos_by_flow[(tag[t.task_id], t.idx_in_flow-1)]
+
+    pred_indptr = [0]*(n+1); pred_indices: List[int] = []
+    for i in range(n):
+        pred_indices.extend(extra_preds.get(i, []))
+        pred_indptr[i+1] = len(pred_indices)
+
+    succ_lists: List[List[int]] = [[] for _ in range(n)]
+    pred_count = [0]*n
+    for i in range(n):
+        if flow_pred[i] >= 0:
+            succ_lists[flow_pred[i]].append(i); pred_count[i] += 1
+        for k in range(pred_indptr[i], pred_indptr[i+1]):
+            succ_lists[pred_indices[k]].append(i); pred_count[i] += 1
+    succ_indptr = [0]*(n+1); succ_indices: List[int] = []
+    for i in range(n):
+        succ_indices.extend(succ_lists[i])
+        succ_indptr[i+1] = len(succ_indices)
+
+    compat_indptr = np.zeros(n+1, dtype=np.int32)
+    compat_indptr[1:] = np.cumsum([len(c) for c in compat])
+    compat_idx = np.array([m for c in compat for m in c], dtype=np.int32)
+    is_compat = [[False]*len(machine_names) for _ in range(n)]
+    for i, c in enumerate(compat):
+        for m in c:
+            is_compat[i][m] = True
+
+    # resolve ล่วงหน้าเป็นตาราง: setup = 0 เมื่อ process เดิมหรือไม่มีใน setup_sd, speed ผ่าน get_speed (fallback 3-key → 2-key → 1.0)
+    setup_sd = setup_sd or {}; speed = speed or {}
+    n_mach, n_proc, n_prod = len(machine_names), len(process_names), len(product_names)
+    setup_tbl = np.zeros((n_mach, n_proc, n_proc), dtype=np.int32)
+    for (m, a, b), v in setup_sd.items():
+        if m in machine_id and a in process_index and b in process_index and a != b:
+            setup_tbl[machine_id[m], process_index[a], process_index[b]] = v
+    speed_tbl = np.ones((n_mach, n_prod, n_proc), dtype=np.float64)
+    for mi, m in enumerate(machine_names):
+        for pi, prod in enumerate(product_names):
+            for qi, proc in enumerate(process_names):
+                speed_tbl[mi, pi, qi] = max(1e-6, get_speed(speed, m, prod, proc))
+    # ceil(duration / speed) ของทุกคู่ (task, machine) คงที่ตลอดการรัน
+    sp = speed_tbl[:, np.asarray(product, dtype=np.int64), np.asarray(process, dtype=np.int64)].T
+    proc_time = np.ceil(np.asarray([t.duration_min for t in tasks], dtype=np.float64)[:, None] / sp).astype(np.int64)
+
+    return TaskArrays(
+        n=n, machine_names=machine_names, machine_id=machine_id,
+        process_names=process_names, product_names=product_names, tag_names=tag_names,
+        order_ids=[t.order_id for t in tasks],
+        duration=[t.duration_min for t in tasks], idx_in_flow=[t.idx_in_flow for t in tasks],
+        process=process, product=product, tag=tag, compat=compat, flow_pred=flow_pred,
+        compat_indptr=compat_indptr, compat_idx=compat_idx, is_compat=is_compat,
+        setup_tbl=setup_tbl.tolist(), proc_time=proc_time.reshape(n, n_mach).tolist(),
+        pred_indptr=pred_indptr, pred_indices=pred_indices, pred_count=pred_count,
+        succ_indptr=succ_indptr, succ_indices=succ_indices,
+    )
+
+@dataclass
+class ScheduleArrays:
+    """ผล decode แบบ SoA (หนึ่งแถวต่อ task ตามลำดับที่ dispatch) — ใช้ใน GA แทน List[ScheduleItem]"""
+    task_id: np.ndarray
+    machine_id: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    setup: np.ndarray
+    late: np.ndarray
+
+    def to_items(self, ta: TaskArrays) -> List[ScheduleItem]:
+        out = []
+        for tid, m, st, en, su, la in zip(self.task_id.tolist(), self.machine_id.tolist(), self.start.tolist(),
+                                          self.end.tolist(), self.setup.tolist(), self.late.tolist()):
+            out.append(ScheduleItem(tid, ta.order_ids[tid], ta.product_names[ta.product[tid]], ta.process_names[ta.process[tid]],
+                                    ta.machine_names[m], st, en, su, la))
+        return out
+
 # =========================
 # Decoder (SGS ready-queue + calendar-aware)
 # =========================
-def align_baseline(day0: date, cal) -> int:
-    return align_to_working(day0, 0, cal)
-
-def build_schedule(tasks, machines, setup_sd, speed, perm, mach_assign, cal, day0, extra_preds):
-    tasks_by_id = {t.task_id: t for t in tasks}
-    baseline = align_baseline(day0, cal)
-    machine_time = {m: baseline for m in machines.keys()}
-    machine_last_proc = {m: None for m in machines.keys()}
-    sched: List[ScheduleItem] = []
-    done_time: Dict[int, int] = {}
-    flow_done: Dict[Tuple[str, int], int] = {}
+def build_schedule(ta: "TaskArrays", perm, mach_assign, tl: WorkTimeline):
+    baseline = tl.baseline
+    machine_names = ta.machine_names
+    s_tid: List[int] = []; s_mach: List[int] = []; s_start: List[int] = []; s_end: List[int] = []; s_setup: List[int] = []
     total_setup = 0
 
-    if not tasks:
+    if not ta.n:
         # ไม่มีงานก็คืนตารางว่าง พร้อม KPI พื้นฐาน
-        kpis = {"baseline_min": baseline, "makespan_min": 0, "total_setup_min": 0, "machine_utilization": {m:0.0 for m in machines.keys()}}
-        return [], kpis
-
-    unscheduled = set(perm)
-    made_progress = True
-    while unscheduled and made_progress:
-        made_progress = False
-        for tid in list(unscheduled):
-            t = tasks_by_id[tid]
-            flow_ready = (t.idx_in_flow == 0) or ((t.tag, t.idx_in_flow-1) in flow_done)
-            bom_ready  = all(pred in done_time for pred in extra_preds.get(tid, []))
-            if not (flow_ready and bom_ready):
-                continue
-
-            m = mach_assign[tid]
-            if m not in t.compatible_machines:
-                m = t.compatible_machines[0]
-
-            earliest = align_to_working(day0, max(baseline, machine_time[m]), cal)
-            if t.idx_in_flow > 0:
-                earliest = max(earliest, flow_done[(t.tag, t.idx_in_flow-1)])
-            for pred in extra_preds.get(tid, []):
-                earliest = max(earliest, done_time[pred])
-
-            setup = get_setup(setup_sd, m, machine_last_proc[m], t.process)
-            sp = max(1e-6, get_speed(speed, m, t.product, t.process))
-            proc = math.ceil(t.duration_min / sp)
-
-            start = earliest
-            after_setup = add_working_minutes(day0, start, setup, cal) if setup else start
-            end = add_working_minutes(day0, after_setup, proc, cal)
-
-            sched.append(ScheduleItem(t.task_id, t.order_id, t.product, t.process, m, start, end, setup, 0))
-            machine_time[m] = end
-            machine_last_proc[m] = t.process
-            done_time[tid] = end
-            flow_done[(t.tag, t.idx_in_flow)] = end
-            total_setup += setup
-            unscheduled.remove(tid)
-            made_progress = True
-
-    if unscheduled:
+        kpis = {"baseline_min": baseline, "makespan_min": 0, "total_setup_min": 0, "machine_utilization": {m:0.0 for m in machine_names}}
+        e = np.zeros(0, dtype=np.int64)
+        return ScheduleArrays(e, e, e, e, e, e), kpis
+
+    # state ทั้งหมดเป็น list ที่ index ด้วย int id (ไม่มี dict/tuple key ใน loop)
+    n_mach = len(machine_names)
+    machine_time = [baseline] * n_mach
+    machine_last_proc = [-1] * n_mach
+    machine_busy = [0] * n_mach   # ผลรวม (end-start) ต่อเครื่อง สำหรับ utilization
+    done_time = [-1] * ta.n
+    process = ta.process
+    compat = ta.compat; is_compat = ta.is_compat; flow_pred = ta.flow_pred
+    setup_tbl = ta.setup_tbl; proc_time = ta.proc_time
+    pred_indptr = ta.pred_indptr; pred_indices = ta.pred_indices
+    if isinstance(perm, np.ndarray): perm = perm.tolist()
+    if isinstance(mach_assign, np.ndarray): mach_assign = mach_assign.tolist()
+
+    # ready-queue: task ที่ predecessor ครบแล้ว เรียงตามตำแหน่งใน perm (แต่ละ task ถูกหยิบครั้งเดียว)
+    succ_indptr = ta.succ_indptr; succ_indices = ta.succ_indices
+    preds_left = ta.pred_count[:]
+    rank = [0] * ta.n
+    for pos, tid in enumerate(perm):
+        rank[tid] = pos
+    ready = [(rank[tid], tid) for tid in range(ta.n) if not preds_left[tid]]
+    heapq.heapify(ready)
+    while ready:
+        _, tid = heapq.heappop(ready)
+        m = mach_assign[tid]
+        if not is_compat[tid][m]:
+            m = compat[tid][0]
+
+        earliest = tl.align(max(baseline, machine_time[m]))
+        fp = flow_pred[tid]
+        if fp >= 0 and done_time[fp] > earliest:
+            earliest = done_time[fp]
+        for k in range(pred_indptr[tid], pred_indptr[tid+1]):
+            d = done_time[pred_indices[k]]
+            if d > earliest:
+                earliest = d
+
+        p = process[tid]
+        lp = machine_last_proc[m]
+        setup = setup_tbl[m][lp][p] if lp >= 0 else 0
+        proc = proc_time[tid][m]
+
+        start = earliest
+        after_setup = tl.add(start, setup) if setup else start
+        end = tl.add(after_setup, proc)
+
+        s_tid.append(tid); s_mach.append(m); s_start.append(start); s_end.append(end); s_setup.append(setup)
+        machine_time[m] = end
+        machine_last_proc[m] = p
+        machine_busy[m] += end - start
+        done_time[tid] = end
+        total_setup += setup
+        for k in range(succ_indptr[tid], succ_indptr[tid+1]):
+            nxt = succ_indices[k]
+            preds_left[nxt] -= 1
+            if not preds_left[nxt]:
+                heapq.heappush(ready, (rank[nxt], nxt))
+
+    if len(s_tid) < ta.n:
         raise RuntimeError("Decoder deadlock: unmet predecessors; check BOM/flow.")
 
-    first_start = min((s.start_min for s in sched), default=baseline)
-    last_end    = max((s.end_min   for s in sched), default=baseline)
+    first_start = min(s_start)
+    last_end    = max(s_end)
     makespan = last_end - first_start
 
     # availability minutes between first_start and last_end
-    def working_available(a, b):
-        t = align_to_working(day0, a, cal); total=0
-        while t < b:
-            day_idx = t // MINUTES_PER_DAY
-            minute_in_day = t % MINUTES_PER_DAY
-            blocks = working_blocks_for_day(day0, day_idx, cal)
-            if not blocks:
-                t = (day_idx+1)*MINUTES_PER_DAY; continue
-            progressed=False
-            for bl in blocks:
-                if bl.end_min <= minute_in_day: continue
-                if minute_in_day < bl.start_min:
-                    t = day_idx*MINUTES_PER_DAY + bl.start_min
-                    minute_in_day = bl.start_min
-                window_end = min(b, day_idx*MINUTES_PER_DAY + bl.end_min)
-                inc = max(0, window_end - (day_idx*MINUTES_PER_DAY + minute_in_day))
-                total += inc
-                t = window_end; minute_in_day = t % MINUTES_PER_DAY
-                progressed=True
-                if t >= b: break
-            if not progressed:
-                t = (day_idx+1)*MINUTES_PER_DAY
-        return max(1, total)
-
-    avail = working_available(first_start, last_end) if last_end>first_start else 1
-    util = {m: (sum((s.end_min-s.start_min) for s in sched if s.machine==m) / avail) for m in machines.keys()}
+    avail = max(1, tl.working_between(first_start, last_end)) if last_end>first_start else 1
+    util = {m: machine_busy[i] / avail for i, m in enumerate(machine_names)}
 
     kpis = {
         "baseline_min": baseline,
@@ -370,6 +600,11 @@ def build_schedule(tasks, machines, setup_sd, speed, perm, mach_assign, cal, day
         "total_setup_min": total_setup,
         "machine_utilization": util
     }
+    sched = ScheduleArrays(
+        np.asarray(s_tid, dtype=np.int64), np.asarray(s_mach, dtype=np.int64),
+        np.asarray(s_start, dtype=np.int64), np.asarray(s_end, dtype=np.int64),
+        np.asarray(s_setup, dtype=np.int64), np.zeros(len(s_tid), dtype=np.int64),
+    )
     return sched, kpis
 
 # =========================
@@ -379,88 +614,200 @@ def minutes_since_day0(day0: date, dt: datetime) -> int:
     base = datetime.combine(day0, datetime.min.time())
     return int((dt - base).total_seconds() // 60)
 
-def compute_tardiness(sched, tasks, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, day0, cal):
-    task_by_id = {t.task_id: t for t in tasks}
-    final_task_id_by_tag = {}
-    for t in tasks:
-        if t.idx_in_flow == product_last_idx_by_tag.get(t.tag, -999):
-            final_task_id_by_tag[t.tag] = t.task_id
-
-    last_end_by_tag: Dict[str, int] = defaultdict(int)
-    for si in sched:
-        t = task_by_id[si.task_id]
-        if t.task_id == final_task_id_by_tag.get(t.tag):
-            last_end_by_tag[t.tag] = max(last_end_by_tag[t.tag], si.end_min)
+@functools.lru_cache(maxsize=None)
+def parse_due_datetime(s: str) -> datetime:
+    # รองรับ "YYYY-MM-DD HH:MM" หรือ "YYYY-MM-DDTHH:MM"
+    dt_str = s.replace("T"," ")
+    try:
+        return datetime.fromisoformat(dt_str)
+    except ValueError:
+        # fallback basic
+        return datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
 
-    baseline = align_to_working(day0, 0, cal)
-    total_tardiness = 0
-    for tag, end_t in last_end_by_tag.items():
-        due_abs: Optional[int] = None
-        if tag in due_date_by_tag:
-            # รองรับ "YYYY-MM-DD HH:MM" หรือ "YYYY-MM-DDTHH:MM"
-            dt_str = due_date_by_tag[tag].replace("T"," ")
-            try:
-                dt = datetime.fromisoformat(dt_str)
-            except ValueError:
-                # fallback basic
-                dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
-            due_abs = minutes_since_day0(day0, dt)
-        elif tag in due_working_by_tag:
-            due_abs = add_working_minutes(day0, baseline, int(due_working_by_tag[tag]), cal)
+@dataclass
+class DuePlan:
+    """due แบบ absolute minute ของ task สุดท้ายแต่ละ tag — คำนวณครั้งเดียวก่อนเข้า GA"""
+    tags: List[str]
+    final_ids: np.ndarray
+    due_abs: np.ndarray
+
+def build_due_plan(tasks, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, tl: WorkTimeline) -> DuePlan:
+    # tag เดียวกันอาจมี task สุดท้ายหลายตัว (order/BOM ซ้ำ) — นับ tardiness ต่อ tag ครั้งเดียว ตัวหลังสุดชนะ
+    due_abs_min_by_tag: Dict[str, Tuple[int, int]] = {}   # tag -> (final task_id, due_abs)
+    for t in tasks:
+        if t.idx_in_flow != product_last_idx_by_tag.get(t.tag, -999):
+            continue
+        if t.tag in due_date_by_tag:
+            due = minutes_since_day0(tl.day0, parse_due_datetime(due_date_by_tag[t.tag]))
+        elif t.tag in due_working_by_tag:
+            due = tl.add(tl.baseline, int(due_working_by_tag[t.tag]))
         else:
             continue
-        late = max(0, end_t - due_abs)
+        due_abs_min_by_tag[t.tag] = (t.task_id, due)
+    tags = list(due_abs_min_by_tag)
+    final_ids = [fid for fid, _ in due_abs_min_by_tag.values()]
+    due_abs = [d for _, d in due_abs_min_by_tag.values()]
+    return DuePlan(tags, np.asarray(final_ids, dtype=np.int64), np.asarray(due_abs, dtype=np.int64))
+
+def compute_tardiness(sched, tasks, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, tl: WorkTimeline):
+    due = build_due_plan(tasks, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, tl)
+    si_by_task_id = {si.task_id: si for si in sched}
+    total_tardiness = 0
+    for final_id, due_abs in zip(due.final_ids.tolist(), due.due_abs.tolist()):
+        si = si_by_task_id.get(final_id)
+        if si is None:
+            continue
+        late = max(0, si.end_min - due_abs)
         total_tardiness += late
-
-        final_id = final_task_id_by_tag.get(tag)
-        if final_id is not None:
-            for si2 in sched:
-                if si2.task_id == final_id:
-                    si2.late_min = late
-                    break
+        si.late_min = late
     return total_tardiness
 
+def compute_tardiness_arrays(sched: ScheduleArrays, ta: TaskArrays, due: DuePlan) -> int:
+    """เหมือน compute_tardiness แต่ทำบน ScheduleArrays (lookup end ของ task สุดท้ายแบบ vector)"""
+    if not len(due.final_ids) or not len(sched.task_id):
+        return 0
+    pos_by_tid = np.empty(ta.n, dtype=np.int64)
+    pos_by_tid[sched.task_id] = np.arange(len(sched.task_id))
+    pos = pos_by_tid[due.final_ids]
+    late = np.maximum(0, sched.end[pos] - due.due_abs)
+    sched.late[pos] = late
+    return int(late.sum())
+
 # =========================
 # Fitness & GA loop
 # =========================
 def fitness_value(kpis, tardiness, cfg: GAConfig):
     return cfg.w_tardiness*tardiness + cfg.w_setup*kpis["total_setup_min"] + cfg.w_makespan*kpis["makespan_min"]
 
-def evaluate_population(population, tasks, machines, setup_sd, speed, cal, day0, extra_preds, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, cfg):
-    fits=[]; decodes=[]
-    for ch in population:
-        sched,k = build_schedule(tasks, machines, setup_sd, speed, ch.perm, ch.mach_assign, cal, day0, extra_preds)
-        tard = compute_tardiness(sched, tasks, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, day0, cal)
-        f = fitness_value(k, tard, cfg)
-        fits.append(f); decodes.append((sched, {**k, "total_tardiness_min": tard}))
+def evaluate_chromosome(ch, ta, tl, due, cfg):
+    sched,k = build_schedule(ta, ch.perm, ch.mach_assign, tl)
+    tard = compute_tardiness_arrays(sched, ta, due)
+    return fitness_value(k, tard, cfg), (sched, {**k, "total_tardiness_min": tard})
+
+# worker process เก็บ input แบบ read-only ไว้ครั้งเดียว แล้วรับแค่ chromosome ต่อ task
+_worker_ctx: Optional[tuple] = None
+
+def _init_worker(*ctx):
+    global _worker_ctx
+    _worker_ctx = ctx
+
+def _eval_in_worker(ch):
+    return evaluate_chromosome(ch, *_worker_ctx)
+
+def _eval_with_ctx(ctx, ch):
+    return evaluate_chromosome(ch, *ctx)
+
+def _gil_enabled() -> bool:
+    # free-threaded CPython (3.13t+) ให้ thread decode พร้อมกันได้จริง
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+def chromosome_key(ch: Chromosome):
+    return ch.perm.tobytes() + ch.mach_assign.tobytes()
+
+def evaluate_population(population, ta, tl, due, cfg, executor=None, chunksize=1, cache=None, eval_fn=_eval_in_worker):
+    # cache: OrderedDict key->(fit, decode) แบบ LRU; decode เฉพาะ chromosome ที่ยังไม่เคยเห็น
+    keys = [chromosome_key(ch) for ch in population]
+    todo: Dict[Any, Chromosome] = {}
+    for key, ch in zip(keys, population):
+        if (cache is None or key not in cache) and key not in todo:
+            todo[key] = ch
+    if executor is not None and todo:
+        results = list(executor.map(eval_fn, todo.values(), chunksize=chunksize))
+    else:
+        results = [evaluate_chromosome(ch, ta, tl, due, cfg)
+                   for ch in todo.values()]
+    fresh = dict(zip(todo.keys(), results))
+    out = []
+    for key in keys:
+        r = fresh.get(key)
+        if r is None:
+            r = cache[key]; cache.move_to_end(key)
+        out.append(r)
+    if cache is not None:
+        cache.update(fresh)
+        while len(cache) > 4*cfg.pop_size:
+            cache.popitem(last=False)
+    fits = [f for f,_ in out]
+    decodes = [d for _,d in out]
     return fits, decodes
 
-def run_ga(tasks, machines, setup_sd, speed, cal, day0, extra_preds, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, cfg=GAConfig(), seed=None):
-    rng=random.Random(seed if seed is not None else cfg.seed)
-    population=init_population(rng, tasks, cfg)
-    fits, decodes = evaluate_population(population, tasks, machines, setup_sd, speed, cal, day0, extra_preds, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, cfg)
+def run_ga(tasks, machines, setup_sd, speed, tl, extra_preds, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, cfg=GAConfig(), seed=None):
+    ta = encode_tasks(tasks, machines, extra_preds, setup_sd, speed)
+    due = build_due_plan(tasks, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, tl)
+    ctx = (ta, tl, due, cfg)
+    ncpu = cfg.n_workers if cfg.n_workers is not None else (os.cpu_count() or 1)
+    # ประชากรเล็กเกินไป ค่า IPC จะแพงกว่าการ decode เอง
+    if ncpu > 1 and cfg.pop_size >= 2*ncpu:
+        if not _gil_enabled():
+            # ไม่มี GIL: ใช้ thread ได้เลย แชร์ ta/tl/due ในหน่วยความจำเดียว ไม่ต้อง pickle
+            with ThreadPoolExecutor(max_workers=ncpu) as ex:
+                return _ga_loop(ta, ctx, cfg, seed, ex, 1, functools.partial(_eval_with_ctx, ctx))
+        with ProcessPoolExecutor(max_workers=ncpu, initializer=_init_worker, initargs=ctx) as ex:
+            return _ga_loop(ta, ctx, cfg, seed, ex, max(1, cfg.pop_size // (4*ncpu)))
+    return _ga_loop(ta, ctx, cfg, seed, None, 1)
+
+def draw_generation(rng: np.random.Generator, fits, n_pairs: int, n: int, cfg: GAConfig) -> Dict[str, list]:
+    pop = len(fits); k = cfg.tournament_k
+    # tournament แบบไม่ซ้ำตัวใน 1 รอบ: เลือก k ตัวแรกจาก key สุ่ม แล้วเอาตัวที่ fitness ต่ำสุด
+    cand = np.argpartition(rng.random((2*n_pairs, pop)), k-1, axis=1)[:, :k]
+    parents = cand[np.arange(2*n_pairs), np.asarray(fits)[cand].argmin(axis=1)]
+    si = rng.integers(0, max(n, 1), (n_pairs, 2))
+    sj = rng.integers(0, max(n-1, 1), (n_pairs, 2))
+    sj = sj + (sj >= si)                      # j != i
+    return {
+        "parents": parents.tolist(),
+        "cx": (rng.random(n_pairs) < cfg.crossover_rate).tolist(),
+        "swap": ((rng.random((n_pairs, 2)) < cfg.mutation_rate) & (n >= 2)).tolist(),
+        "si": si.tolist(), "sj": sj.tolist(),
+        "remach": ((rng.random((n_pairs, 2)) < cfg.mutation_rate) & (n >= 1)).tolist(),
+        "mk": rng.integers(0, max(n, 1), (n_pairs, 2)).tolist(),
+        "mu": rng.random((n_pairs, 2)).tolist(),
+    }
+
+def _ga_loop(ta, ctx, cfg, seed, executor, chunksize, eval_fn=_eval_in_worker):
+    rng=np.random.default_rng(seed if seed is not None else cfg.seed)
+    cache: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+    population=init_population(rng, ta, cfg)
+    fits, decodes = evaluate_population(population, *ctx, executor=executor, chunksize=chunksize, cache=cache, eval_fn=eval_fn)
     best_idx=min(range(len(population)), key=lambda i: fits[i])
     best=population[best_idx]; best_sched, best_k=decodes[best_idx]
     for _ in range(cfg.generations):
-        new_pop=[]
-        elites=[p for p,_ in sorted(zip(population,fits), key=lambda x:x[1])[:cfg.elite_count]]
-        new_pop.extend(elites)
-        while len(new_pop)<cfg.pop_size:
-            p1=tournament_select(rng, population, fits, cfg.tournament_k)
-            p2=tournament_select(rng, population, fits, cfg.tournament_k)
+        # elite ผ่านไปรุ่นถัดไปพร้อม fitness/decode เดิม ไม่ต้อง evaluate ซ้ำ
+        elite_idx=sorted(range(len(population)), key=lambda i: fits[i])[:cfg.elite_count]
+        new_pop=[population[i] for i in elite_idx]
+        new_fits=[fits[i] for i in elite_idx]
+        new_decodes=[decodes[i] for i in elite_idx]
+        # มี pool: ส่งลูกเข้า worker ทันทีที่สร้าง ให้ decode ซ้อนกับการสร้างลูกตัวถัดไป
+        pending: Dict[Any, Any] = {}
+        def submit(ch):
+            key = chromosome_key(ch)
+            if key not in cache and key not in pending:
+                pending[key] = executor.submit(eval_fn, ch)
+        # ดึงค่าสุ่มทั้งรุ่นครั้งเดียว: tournament, crossover flag, mutation flag/ตำแหน่ง
+        n_pairs=(cfg.pop_size-len(new_pop)+1)//2
+        d=draw_generation(rng, fits, n_pairs, ta.n, cfg)
+        for q in range(n_pairs):
+            p1=population[d["parents"][2*q]]
+            p2=population[d["parents"][2*q+1]]
             c1,c2=p1,p2
-            if rng.random()<cfg.crossover_rate:
+            if d["cx"][q]:
                 c1,c2=ox_crossover(rng,p1,p2)
-            c1=mutate(rng,c1,tasks,cfg.mutation_rate)
-            c2=mutate(rng,c2,tasks,cfg.mutation_rate)
+            c1=apply_mutation(c1, ta, d["swap"][q][0], d["si"][q][0], d["sj"][q][0], d["remach"][q][0], d["mk"][q][0], d["mu"][q][0])
+            c2=apply_mutation(c2, ta, d["swap"][q][1], d["si"][q][1], d["sj"][q][1], d["remach"][q][1], d["mk"][q][1], d["mu"][q][1])
             new_pop.append(c1)
-            if len(new_pop)<cfg.pop_size: new_pop.append(c2)
+            if executor is not None: submit(c1)
+            if len(new_pop)<cfg.pop_size:
+                new_pop.append(c2)
+                if executor is not None: submit(c2)
+        for key, fut in pending.items():
+            cache[key] = fut.result()
+        child_fits, child_decodes = evaluate_population(new_pop[len(elite_idx):], *ctx, executor=executor, chunksize=chunksize, cache=cache, eval_fn=eval_fn)
         population=new_pop
-        fits, decodes = evaluate_population(population, tasks, machines, setup_sd, speed, cal, day0, extra_preds, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag, cfg)
+        fits=new_fits+child_fits; decodes=new_decodes+child_decodes
         idx=min(range(len(population)), key=lambda i: fits[i])
         if fits[idx] < fits[best_idx]:
             best_idx=idx; best=population[idx]; best_sched, best_k=decodes[idx]
-    return best, best_sched, best_k
+    return best, best_sched.to_items(ta), best_k
 
 # =========================
 # I/O & CLI
@@ -563,23 +910,32 @@ def save_artifacts(day0: date, sched: List[ScheduleItem], kpis: Dict[str,float],
 # =========================
 # API payload normalizer + calendar builder
 # =========================
+def _merge_intervals(iv: List[Tuple[int,int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """รวมช่วงที่ทับ/ชนกันเป็น union แบบเรียงแล้ว คืน (starts, ends)"""
+    a = np.asarray(sorted(iv), dtype=np.int64).reshape(-1, 2)
+    a = a[a[:,1] > a[:,0]]
+    if not len(a):
+        return a[:,0], a[:,1]
+    reach = np.maximum.accumulate(a[:,1])
+    head = np.ones(len(a), dtype=bool)
+    head[1:] = a[1:,0] > reach[:-1]
+    idx = np.flatnonzero(head)
+    return a[idx,0], np.maximum.reduceat(a[:,1], idx)
+
 def _split_blocks_by_breaks(blocks: List[Tuple[int,int]], breaks: List[Tuple[int,int]]) -> List[Tuple[int,int]]:
     if not breaks: return blocks
+    bs, be = _merge_intervals(breaks)
     out=[]
     for s,e in blocks:
-        segs=[(s,e)]
-        for bs,be in breaks:
-            new=[]
-            for xs,xe in segs:
-                if be<=xs or xe<=bs:
-                    new.append((xs,xe))
-                else:
-                    if xs<bs: new.append((xs,bs))
-                    if be<xe: new.append((be,xe))
-            segs=new
-        out.extend(segs)
+        # break ที่ตัดกับ [s,e) คือ index i..j-1 ของ union
+        i = int(np.searchsorted(be, s, side="right"))
+        j = int(np.searchsorted(bs, e, side="left"))
+        seg_s = np.concatenate(([s], be[i:j])); seg_e = np.concatenate((bs[i:j], [e]))
+        seg_s = np.maximum(seg_s, s); seg_e = np.minimum(seg_e, e)
+        keep = seg_e > seg_s
+        out.extend(zip(seg_s[keep].tolist(), seg_e[keep].tolist()))
     out.sort()
-    return [(a,b) for a,b in out if b>a]
+    return out
 
 def calendar_from_json(dct) -> CalendarConfig:
     raw_wb = dct.get("weekday_blocks", {}) or {}
@@ -689,6 +1045,7 @@ def main():
     ap.add_argument("--w_setup", type=float, default=None)
     ap.add_argument("--w_makespan", type=float, default=None)
     ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes for fitness evaluation (default: CPU count, 1 = off)")
     args = ap.parse_args()
 
     raw = json.load(open(args.input,"r",encoding="utf-8"))
@@ -703,6 +1060,7 @@ def main():
 
     tasks, extra_preds, product_last_idx_by_tag, due_working_by_tag, due_date_by_tag = \
         build_tasks_with_bom(process_defs, product_defs, orders_single, orders_multi)
+    tl = WorkTimeline.build(day0, cal, estimate_horizon_days(tasks, cal))
 
     cfg = GAConfig(
         pop_size      = args.pop_size      if args.pop_size      is not None else 80,
@@ -714,11 +1072,12 @@ def main():
         w_tardiness   = args.w_tardiness   if args.w_tardiness   is not None else 1.0,
         w_setup       = args.w_setup       if args.w_setup       is not None else 0.3,
         w_makespan    = args.w_makespan    if args.w_makespan    is not None else 0.2,
-        seed          = args.seed          if args.seed          is not None else 123
+        seed          = args.seed          if args.seed          is not None else 123,
+        n_workers     = args.workers
     )
 
     best, sched, kpis = run_ga(
-        tasks, machines, setup_sd, speed, cal, day0,
+        tasks, machines, setup_sd, speed, tl,
         extra_preds, product_last_idx_by_tag,
         due_working_by_tag, due_date_by_tag,
         cfg=cfg, seed=cfg.seed
@@ -726,7 +1085,7 @@ def main():
 
     tard = compute_tardiness(
         sched, tasks, product_last_idx_by_tag,
-        due_working_by_tag, due_date_by_tag, day0, cal
+        due_working_by_tag, due_date_by_tag, tl
     )
     kpis["total_tardiness_min"] = tard
 
@@ -8,21 +8,33 @@
 # - Shift windows with holidays & maintenance subtraction
 # - Operator requirements (setup/run), machine efficiency, speed overrides
 # - Clear separation via Context + interval utilities
+# - Batches are immutable Batch tuples; GA chromosomes are int32 permutations of batch indices
 # -------------------------------------------------------------
 from __future__ import annotations
-import json, os, math, random, datetime as dt
-from dataclasses import dataclass
-from typing import List, Dict, Any, Tuple, Optional
-from copy import deepcopy
+import json, os, sys, io, csv, math, random, bisect, functools, datetime as dt
+from operator import itemgetter
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Tuple, Optional, NamedTuple
+import numpy as np
 
 # ============================= Utilities =============================
 
+_strptime = dt.datetime.strptime   # module-level binding: one global lookup instead of two attribute loads
+
 def parse_datetime(s) -> dt.datetime:
     """Parse many common formats. Raise if impossible to avoid silent bugs."""
     if isinstance(s, dt.datetime):
         return s
     if not s:
         raise ValueError("Empty datetime value")
+    return _parse_datetime_str(str(s))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_datetime_str(s: str) -> dt.datetime:
+    """Cached strptime over the accepted formats; failures raise and are not cached."""
     fmts = [
         "%Y-%m-%dT%H:%M:%S%z",
         "%Y-%m-%dT%H:%M:%S",
@@ -32,7 +44,7 @@ def parse_datetime(s) -> dt.datetime:
     last_err = None
     for f in fmts:
         try:
-            d = dt.datetime.strptime(str(s), f)
+            d = _strptime(s, f)
             return d
         except Exception as e:
             last_err = e
@@ -40,10 +52,28 @@ def parse_datetime(s) -> dt.datetime:
     raise ValueError(f"Cannot parse datetime: {s!r}. Last error: {last_err}")
 
 
+def fmt_minute(d: dt.datetime) -> str:
+    """Same text as d.strftime("%Y-%m-%d %H:%M"), without strftime's format parsing."""
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}"
+
+
 def timedelta_minutes(m: float) -> dt.timedelta:
     return dt.timedelta(seconds=float(m) * 60.0)
 
 
+# Integer time axis: minutes since EPOCH (naive datetimes)
+EPOCH = dt.datetime(2000, 1, 1)
+_ONE_MIN = dt.timedelta(minutes=1)
+
+
+def to_min(d: dt.datetime) -> int:
+    return (d - EPOCH) // _ONE_MIN
+
+
+def from_min(m: float) -> dt.datetime:
+    return EPOCH + dt.timedelta(minutes=m)
+
+
 # ============================= Data Loading =============================
 
 def load_data(json_path: str = "/mnt/data/mock.json") -> Dict[str, Any]:
@@ -126,11 +156,71 @@ def index_work_centers(work_centers: List[Dict[str, Any]]):
 
 
 def index_machines(machines: List[Dict[str, Any]]):
+    """by_wc values are tuples: shared read-only, never copied by callers."""
     by_id = {m['machine_id']: m for m in machines}
     by_wc: Dict[str, List[Dict[str, Any]]] = {}
     for m in machines:
         by_wc.setdefault(m['work_center_id'], []).append(m)
-    return by_id, by_wc
+    return by_id, {wc_id: tuple(ms) for wc_id, ms in by_wc.items()}
+
+
+def index_operators(operators: List[Dict[str, Any]]):
+    """Operators by lower-cased skill (matched against op name) and by assignable work center."""
+    by_skill: Dict[str, List[Dict[str, Any]]] = {}
+    by_wc: Dict[str, List[Dict[str, Any]]] = {}
+    for o in operators:
+        for sk in {s.lower() for s in (o.get('skills', []) or [])}:
+            by_skill.setdefault(sk, []).append(o)
+        for wc_id in set(o.get('assignable_to', []) or []):
+            by_wc.setdefault(wc_id, []).append(o)
+    return by_skill, by_wc
+
+
+def index_setup_states(data: Dict[str, Any], setup_mats: Dict[str, Any]):
+    """Global setup-state -> index, plus each matrix as a dense float64 [prev, next] array (NaN = no entry)."""
+    states: Dict[str, int] = {'clean': 0}
+    for m in data.get('machines', []):
+        states.setdefault(m.get('initial_state', 'clean'), len(states))
+    for r in data.get('routings', []):
+        for op in r.get('operations', []):
+            states.setdefault(op.get('setup_state_key', 'clean'), len(states))
+    for mat in setup_mats.values():
+        for prev, row in (mat.get('matrix', {}) or {}).items():
+            states.setdefault(prev, len(states))
+            for nxt in row:
+                states.setdefault(nxt, len(states))
+    arrs: Dict[str, np.ndarray] = {}
+    for mat_id, mat in setup_mats.items():
+        arr = np.full((len(states), len(states)), np.nan)
+        for prev, row in (mat.get('matrix', {}) or {}).items():
+            for nxt, v in row.items():
+                arr[states[prev], states[nxt]] = float(v)
+        arrs[mat_id] = arr
+    return states, arrs
+
+
+def index_speed_overrides(speed_overrides: List[Dict[str, Any]]):
+    """Fold overrides into (machine, product, op_name) and (machine, op_name) -> combined multiplier."""
+    so3: Dict[Tuple[str, str, str], float] = {}
+    so2: Dict[Tuple[str, str], float] = {}
+    for so in speed_overrides:
+        key = so.get('key', [])
+        mult = so.get('multiplier', 1.0) or 1.0
+        if len(key) == 3:
+            so3[tuple(key)] = so3.get(tuple(key), 1.0) * mult
+        elif len(key) == 2:
+            so2[tuple(key)] = so2.get(tuple(key), 1.0) * mult
+    return so3, so2
+
+
+def index_candidates_by_wc(idx_wc: Dict[str, Any], m_by_id: Dict[str, Any], m_by_wc: Dict[str, Tuple[Dict[str, Any], ...]]):
+    """Candidate machines per work center: machines declaring the wc, else the wc's parallel_machines (de-duped, declared order)."""
+    res: Dict[str, Tuple[Dict[str, Any], ...]] = dict(m_by_wc)
+    for wc_id, wc in idx_wc.items():
+        if not res.get(wc_id):
+            ids = dict.fromkeys(wc.get('parallel_machines', []))
+            res[wc_id] = tuple(m_by_id[mid] for mid in ids if mid in m_by_id)
+    return res
 
 
 def index_setup_mats(setup_matrices: List[Dict[str, Any]]):
@@ -150,37 +240,79 @@ def collect_speed_overrides(d: Dict[str, Any]) -> List[Dict[str, Any]]:
     return res
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Context:
     data: Dict[str, Any]
     setup_mats: Dict[str, Any]
+    state_idx: Dict[str, int]
+    setup_arrs: Dict[str, np.ndarray]
     speed_overrides: List[Dict[str, Any]]
+    so3: Dict[Tuple[str, str, str], float]
+    so2: Dict[Tuple[str, str], float]
     idx_products: Dict[str, Any]
     idx_routings: Dict[str, Any]
     idx_wc: Dict[str, Any]
     idx_machines_by_id: Dict[str, Any]
-    idx_machines_by_wc: Dict[str, List[Dict[str, Any]]]
+    idx_machines_by_wc: Dict[str, Tuple[Dict[str, Any], ...]]
+    idx_ops_by_op_name: Dict[str, List[Dict[str, Any]]]
+    idx_ops_by_wc: Dict[str, List[Dict[str, Any]]]
     settings: Dict[str, Any]
+    due_by_order: Dict[str, dt.datetime]
+    release_by_order: Dict[str, dt.datetime]
+    w_make: float
+    w_tard: float
+    w_setup: float
+    order_index: Dict[str, int]            # order_id -> row of due_min_per_order
+    due_min_per_order: np.ndarray          # int64 due minutes on the EPOCH axis, aligned with order_index
+    candidates_by_wc: Dict[str, Tuple[Dict[str, Any], ...]]
+    # routing_id -> static per-op tables (see _routing_steps); filled right after construction, entries need the ctx
+    routing_steps: Dict[str, List[Tuple]]
+    # (anchor date, days) -> build_shift_windows_min result; windows depend on the anchor's date only
+    _shift_windows_cache: Dict[Tuple[dt.date, int], Any] = field(default_factory=dict, repr=False, compare=False)
 
     @staticmethod
     def from_data(data: Dict[str, Any]) -> "Context":
         setup_mats = index_setup_mats(data.get('setup_matrices', []))
+        state_idx, setup_arrs = index_setup_states(data, setup_mats)
         speed_overrides = collect_speed_overrides(data)
+        so3, so2 = index_speed_overrides(speed_overrides)
         idx_products_ = index_products(data.get('products', []))
         idx_routings_ = index_routings(data.get('routings', []))
         idx_wc_ = index_work_centers(data.get('work_centers', []))
         m_by_id, m_by_wc = index_machines(data.get('machines', []))
-        return Context(
+        ops_by_name, ops_by_wc = index_operators(data.get('operators', []) or [])
+        settings = data.get('settings', {}) or {}
+        w = settings.get('objective_weights', {})
+        all_orders = list(data.get('orders', [])) + list(data.get('orders_multiline', []))
+        due_by_order = {o['order_id']: parse_datetime(o['due_date']) for o in all_orders}
+        ctx = Context(
             data=data,
             setup_mats=setup_mats,
+            state_idx=state_idx,
+            setup_arrs=setup_arrs,
             speed_overrides=speed_overrides,
+            so3=so3,
+            so2=so2,
             idx_products=idx_products_,
             idx_routings=idx_routings_,
             idx_wc=idx_wc_,
             idx_machines_by_id=m_by_id,
             idx_machines_by_wc=m_by_wc,
-            settings=data.get('settings', {}) or {}
+            idx_ops_by_op_name=ops_by_name,
+            idx_ops_by_wc=ops_by_wc,
+            settings=settings,
+            due_by_order=due_by_order,
+            release_by_order={o['order_id']: parse_datetime(o['release_date']) for o in all_orders if o.get('release_date')},
+            w_make=w.get('makespan', 1.0),
+            w_tard=w.get('tardiness', 10.0),
+            w_setup=w.get('setup_cost', 5.0),
+            order_index={oid: i for i, oid in enumerate(due_by_order)},
+            due_min_per_order=np.array([to_min(d) for d in due_by_order.values()], dtype=np.int64),
+            candidates_by_wc=index_candidates_by_wc(idx_wc_, m_by_id, m_by_wc),
+            routing_steps={},
         )
+        ctx.routing_steps.update((rid, _routing_steps(ctx, r)) for rid, r in idx_routings_.items())
+        return ctx
 
 
 # ============================= Batch builder =============================
@@ -191,14 +323,26 @@ def normalize_orders_for_batching(data: Dict[str, Any]):
     return base + multi
 
 
-def build_batches(ctx: Context, orders: List[Dict[str, Any]]):
+class Batch(NamedTuple):
+    order_id: str
+    product_id: str
+    routing_id: str
+    qty: int
+    priority: Any
+    due_date: dt.datetime
+    release_date: dt.datetime
+
+
+def build_batches(ctx: Context, orders: List[Dict[str, Any]]) -> List[Batch]:
     prod_by_id = ctx.idx_products
     routing_by_id = ctx.idx_routings
 
-    batches = []
+    batches: List[Batch] = []
+    last: Optional[Batch] = None   # batches[-1]
     now = dt.datetime.now()
 
     for order in orders:
+        order_id = order['order_id']
         order_due = parse_datetime(order['due_date'])
         order_rel = parse_datetime(order.get('release_date', now.strftime("%Y-%m-%d %H:%M")))
         order_pri = order.get('priority', 1)
@@ -231,23 +375,18 @@ def build_batches(ctx: Context, orders: List[Dict[str, Any]]):
 
             min_batch = int(batch_rule.get('min_batch_qty', qty_total))
             max_batch = max(1, int(batch_rule.get('max_batch_qty', qty_total)))
+            routing_id = prod['routing_id']
+            line_prio = line.get('priority', order_pri)
             remaining = qty_total
 
             while remaining > 0:
                 take = min(remaining, max_batch)
                 # if last chunk smaller than min_batch, merge with previous if exists
-                if remaining <= max_batch and take < min_batch and batches and batches[-1]['order_id'] == order['order_id'] and batches[-1]['product_id'] == pid:
-                    batches[-1]['qty'] += take
+                if remaining <= max_batch and take < min_batch and last is not None and last.order_id == order_id and last.product_id == pid:
+                    last = batches[-1] = last._replace(qty=last.qty + take)
                 else:
-                    batches.append({
-                        "order_id": order['order_id'],
-                        "product_id": pid,
-                        "routing_id": prod['routing_id'],
-                        "qty": take,
-                        "priority": line.get('priority', order_pri),
-                        "due_date": order_due,
-                        "release_date": order_rel
-                    })
+                    last = Batch(order_id, pid, routing_id, take, line_prio, order_due, order_rel)
+                    batches.append(last)
                 remaining -= take
     return batches
 
@@ -269,186 +408,198 @@ def _lookup_matrix_setup_min(ctx: Context, prev_state: str, next_state: str, mac
         wc_id = op.get('work_center_id')
         wc = ctx.idx_wc.get(wc_id) if wc_id else None
         mat_id = wc.get('setup_matrix_id') if wc else None
-    if mat_id and mat_id in ctx.setup_mats:
-        mat_obj = ctx.setup_mats[mat_id]
-        matrix = mat_obj.get('matrix', {})
-        if prev_state in matrix and next_state in matrix[prev_state]:
-            return float(matrix[prev_state][next_state])
+    arr = ctx.setup_arrs.get(mat_id) if mat_id else None
+    if arr is not None:
+        pi, ni = ctx.state_idx.get(prev_state), ctx.state_idx.get(next_state)
+        if pi is not None and ni is not None:
+            v = arr[pi, ni]
+            if v == v:  # not NaN
+                return float(v)
     return _get_fixed_setup_min(op)
 
 
-def _get_proc_time_min(ctx: Context, op: Dict[str, Any], qty: float, *, machine_id: Optional[str]=None, product_id: Optional[str]=None, machine_eff: float=1.0) -> float:
+def _get_per_unit_min(op: Dict[str, Any]) -> float:
     # accept proc_time_per_unit_min or proc_time_per_unit (hours)
     if 'proc_time_per_unit_min' in op:
-        per_unit_min = float(op['proc_time_per_unit_min'])
-    elif 'proc_time_per_unit' in op:
-        per_unit_min = float(op['proc_time_per_unit']) * 60.0
-    else:
-        per_unit_min = 0.0
-
-    total_min = per_unit_min * float(qty)
-
-    # speed overrides
-    for so in ctx.speed_overrides:
-        key = so.get('key', [])
-        mult = so.get('multiplier', 1.0) or 1.0
-        if not mult:
-            continue
-        if len(key) == 3:
-            mk, pk, ok = key
-            if (machine_id == mk) and (product_id == pk) and (op.get('name') == ok):
-                total_min = total_min / mult
-        elif len(key) == 2:
-            mk, ok = key
-            if (machine_id == mk) and (op.get('name') == ok):
-                total_min = total_min / mult
-
-    # efficiency (e.g., 0.9 → slower → more minutes)
-    if machine_eff and machine_eff > 0:
-        total_min = total_min / float(machine_eff)
-
-    return total_min
+        return float(op['proc_time_per_unit_min'])
+    if 'proc_time_per_unit' in op:
+        return float(op['proc_time_per_unit']) * 60.0
+    return 0.0
 
 
 # ============================= Interval utils =============================
 
-Interval = Tuple[dt.datetime, dt.datetime]
-
-def _merge_intervals(intervals: List[Interval]) -> List[Interval]:
-    if not intervals:
-        return []
-    intervals = sorted(intervals)
-    merged = [intervals[0]]
-    for s, e in intervals[1:]:
-        ls, le = merged[-1]
-        if s <= le:
-            merged[-1] = (ls, max(le, e))
-        else:
-            merged.append((s, e))
-    return merged
-
-
-def _subtract_intervals(base: List[Interval], subtracts: List[Interval]) -> List[Interval]:
-    """Subtract 'subtracts' from 'base' (both lists of [s,e])."""
-    if not base:
-        return []
-    if not subtracts:
-        return base[:]
-    subtracts = _merge_intervals(subtracts)
-    out: List[Interval] = []
-    for bs, be in base:
-        cur_segments = [(bs, be)]
-        for ss, se in subtracts:
-            next_segments: List[Interval] = []
-            for cs, ce in cur_segments:
-                if se <= cs or ss >= ce:  # no overlap
-                    next_segments.append((cs, ce))
-                else:
-                    # overlap
-                    if ss > cs:
-                        next_segments.append((cs, ss))
-                    if se < ce:
-                        next_segments.append((se, ce))
-            cur_segments = next_segments
-        out.extend(cur_segments)
-    return [seg for seg in out if seg[1] > seg[0]]
-
-
-def _intersect_two(a: List[Interval], b: List[Interval]) -> List[Interval]:
-    i, j = 0, 0
-    res: List[Interval] = []
-    a = sorted(a)
-    b = sorted(b)
-    while i < len(a) and j < len(b):
-        s = max(a[i][0], b[j][0])
-        e = min(a[i][1], b[j][1])
-        if s < e:
-            res.append((s, e))
-        if a[i][1] < b[j][1]:
-            i += 1
-        else:
-            j += 1
-    return res
+# Minute-axis interval (minutes since EPOCH); decode works on these instead of datetimes
+MinInterval = Tuple[float, float]
+
+# On the integer minute axis a window list is a pair of sorted int64 arrays (starts, ends).
+Windows = Tuple[np.ndarray, np.ndarray]
+
+_EMPTY_WINDOWS: Windows = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+
+def _merge_np(starts: np.ndarray, ends: np.ndarray) -> Windows:
+    if not len(starts):
+        return _EMPTY_WINDOWS
+    o = np.argsort(starts, kind="stable")
+    starts, ends = starts[o], ends[o]
+    reach = np.maximum.accumulate(ends)
+    head = np.ones(len(starts), dtype=bool)
+    head[1:] = starts[1:] > reach[:-1]          # touching intervals merge
+    idx = np.flatnonzero(head)
+    return starts[idx], np.maximum.reduceat(ends, idx)
+
+
+def _subtract_np(base: Windows, subs: Windows) -> Windows:
+    bs, be = base
+    if not len(bs):
+        return _EMPTY_WINDOWS
+    ss, se = _merge_np(*subs)
+    if not len(ss):
+        return bs.copy(), be.copy()
+    # subtracts overlapping base i are ss/se[j0[i]:j1[i]]
+    j0 = np.searchsorted(se, bs, side="right")
+    j1 = np.maximum(np.searchsorted(ss, be, side="left"), j0)
+    cnt = j1 - j0 + 1                              # pieces per base before dropping empties
+    owner = np.repeat(np.arange(len(bs)), cnt)
+    k = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+    last = len(ss) - 1
+    ps = np.where(k == 0, bs[owner], se[np.clip(j0[owner] + k - 1, 0, last)])
+    pe = np.where(k == cnt[owner] - 1, be[owner], ss[np.clip(j0[owner] + k, 0, last)])
+    ps = np.maximum(ps, bs[owner]); pe = np.minimum(pe, be[owner])
+    keep = pe > ps
+    return ps[keep], pe[keep]
+
+
+def _intersect_np(a: Windows, b: Windows) -> Windows:
+    """a ∩ b for merged (sorted, disjoint) window arrays, in order."""
+    as_, ae = a
+    bs, be = b
+    if not len(as_) or not len(bs):
+        return _EMPTY_WINDOWS
+    # b windows overlapping a[i] are b[j0[i]:j1[i]]
+    j0 = np.searchsorted(be, as_, side="right")
+    j1 = np.maximum(np.searchsorted(bs, ae, side="left"), j0)
+    cnt = j1 - j0
+    owner = np.repeat(np.arange(len(as_)), cnt)
+    jb = j0[owner] + np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+    ps = np.maximum(as_[owner], bs[jb])
+    pe = np.minimum(ae[owner], be[jb])
+    keep = pe > ps
+    return ps[keep], pe[keep]
 
 
 # ============================= Windows (shifts/holidays/maintenance) =============================
 
-def _time_on_date(date: dt.date, hhmm: str) -> dt.datetime:
-    hh, mm = map(int, hhmm.split(":"))
-    return dt.datetime(year=date.year, month=date.month, day=date.day, hour=hh, minute=mm)
+def build_shift_windows_min(ctx: Context, start_anchor: dt.datetime, days: int = 7):
+    """Machine and operator shift windows (holidays and maintenance removed) as (starts, ends) int64
+       minute arrays on the EPOCH axis.
+       Memoized on ctx per (start_anchor.date(), days); callers must not modify the returned arrays.
+    """
+    key = (start_anchor.date(), days)
+    res = ctx._shift_windows_cache.get(key)
+    if res is None:
+        res = ctx._shift_windows_cache[key] = _build_shift_windows_min(ctx, start_anchor, days)
+    return res
 
 
-def build_shift_windows(ctx: Context, start_anchor: dt.datetime, days: int = 7):
-    """Return: dict(machine_id->windows), dict(operator_id->windows). Remove holidays and maintenance."""
+def _build_shift_windows_min(ctx: Context, start_anchor: dt.datetime, days: int):
     data = ctx.data
-    # shifts indexed
-    shift_by = {s['shift_id']: s for s in data.get('shifts', [])}
-
-    # prebuild shift windows by id
-    windows_by_shift: Dict[str, List[Interval]] = {}
-    for sid, s in shift_by.items():
-        windows: List[Interval] = []
-        for d in range(days):
-            base = (start_anchor.date() + dt.timedelta(days=d))
-            st = _time_on_date(base, s['start_time'])
-            en = _time_on_date(base, s['end_time'])
-            if en <= st:  # cross-midnight
-                en = en + dt.timedelta(days=1)
-            windows.append((st, en))
-        windows_by_shift[sid] = windows
+    cal = data.get('calendar', {}) or {}
+    day0 = to_min(dt.datetime.combine(start_anchor.date(), dt.time()))
+    day_offsets = day0 + np.arange(days, dtype=np.int64) * 1440
+
+    # prebuild shift windows by id: one broadcast per shift
+    windows_by_shift: Dict[str, Windows] = {}
+    for s in data.get('shifts', []):
+        sh, sm = map(int, s['start_time'].split(":"))
+        eh, em = map(int, s['end_time'].split(":"))
+        st_off, en_off = sh*60 + sm, eh*60 + em
+        if en_off <= st_off:  # cross-midnight
+            en_off += 1440
+        windows_by_shift[s['shift_id']] = (day_offsets + st_off, day_offsets + en_off)
 
     # Holidays subtraction for machines & operators
-    holis = []
-    for h in (data.get('calendar', {}) or {}).get('holidays', []) or []:
+    hol_days = []
+    for h in cal.get('holidays', []) or []:
         try:
-            d = dt.datetime.strptime(h, "%Y-%m-%d").date()
+            d = _strptime(h, "%Y-%m-%d").date()
         except Exception:
             d = parse_datetime(h).date()
-        holis.append((dt.datetime(d.year, d.month, d.day), dt.datetime(d.year, d.month, d.day) + dt.timedelta(days=1)))
-
-    # Machines windows
-    machines_by_id = ctx.idx_machines_by_id
-    windows_by_machine: Dict[str, List[Interval]] = {}
-    for mid, m in machines_by_id.items():
-        shift_ids = m.get('shifts', [])
-        merged: List[Interval] = []
-        for sid in shift_ids:
-            merged.extend(windows_by_shift.get(sid, []))
-        if not merged:  # 24/7 default
-            start = start_anchor.replace(hour=0, minute=0, second=0, microsecond=0)
-            merged = [(start, start + dt.timedelta(days=days))]
-        merged = _merge_intervals(merged)
-        # subtract holidays
-        merged = _subtract_intervals(merged, holis)
-        # subtract maintenance
-        maints: List[Interval] = []
-        for mm in (data.get('calendar', {}) or {}).get('machine_maintenances', []) or []:
-            if mm.get('machine_id') == mid:
-                ms = parse_datetime(mm['start'])
-                me = parse_datetime(mm['end'])
-                maints.append((ms, me))
-        merged = _subtract_intervals(merged, maints)
+        hol_days.append(to_min(dt.datetime(d.year, d.month, d.day)))
+    hol_s = np.asarray(hol_days, dtype=np.int64)
+    holis: Windows = (hol_s, hol_s + 1440)
+
+    def _union(shift_ids) -> Windows:
+        parts = [windows_by_shift[sid] for sid in shift_ids if sid in windows_by_shift]
+        if not parts:
+            return _EMPTY_WINDOWS
+        return _merge_np(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+    maints_by_machine: Dict[str, List[Tuple[int, int]]] = {}
+    for mm in cal.get('machine_maintenances', []) or []:
+        maints_by_machine.setdefault(mm.get('machine_id'), []).append(
+            (to_min(parse_datetime(mm['start'])), to_min(parse_datetime(mm['end']))))
+
+    # Machines windows; holidays are global, so they are subtracted once per distinct shift set
+    windows_by_machine: Dict[str, Windows] = {}
+    machine_base: Dict[Tuple[str, ...], Windows] = {}
+    for mid, m in ctx.idx_machines_by_id.items():
+        key = tuple(m.get('shifts', []))
+        merged = machine_base.get(key)
+        if merged is None:
+            merged = _union(key)
+            if not len(merged[0]):  # 24/7 default
+                merged = (np.array([day0], dtype=np.int64), np.array([day0 + days*1440], dtype=np.int64))
+            merged = machine_base[key] = _subtract_np(merged, holis)
+        maints = maints_by_machine.get(mid)
+        if maints:
+            merged = _subtract_np(merged, (np.array([x[0] for x in maints], dtype=np.int64),
+                                           np.array([x[1] for x in maints], dtype=np.int64)))
         windows_by_machine[mid] = merged
 
     # Operator windows (based on their shifts), then subtract holidays
-    windows_by_operator: Dict[str, List[Interval]] = {}
+    windows_by_operator: Dict[str, Windows] = {}
+    operator_base: Dict[Tuple[str, ...], Windows] = {}
     for op in data.get('operators', []) or []:
-        merged: List[Interval] = []
-        for sid in op.get('shifts', []) or []:
-            merged.extend(windows_by_shift.get(sid, []))
-        merged = _merge_intervals(merged)
-        merged = _subtract_intervals(merged, holis)
-        windows_by_operator[op['operator_id']] = merged
+        key = tuple(op.get('shifts', []) or [])
+        w = operator_base.get(key)
+        if w is None:
+            w = operator_base[key] = _subtract_np(_union(key), holis)
+        windows_by_operator[op['operator_id']] = w
 
     return windows_by_machine, windows_by_operator
 
 
-def _find_slot_in_windows(windows: List[Interval], earliest: dt.datetime, need_min: float, require_full_coverage: bool = False) -> Optional[Interval]:
+def _find_slot_in_windows(windows: List[MinInterval], earliest: float, need_min: float, require_full_coverage: bool = False,
+                          ends: Optional[List[float]] = None, durs: Optional[List[float]] = None,
+                          reach: Optional[List[float]] = None) -> Optional[MinInterval]:
     """Find first slot (s,e) within windows after earliest, with duration need_min minutes contiguous.
-       If require_full_coverage=True, slot must lie wholly inside one window.
+       Times are minutes on the EPOCH axis. If require_full_coverage=True, slot must lie wholly inside one window.
+       ends: sorted window ends (parallel to windows) to bisect past windows that close before earliest.
+       durs/reach (with ends): window lengths and their suffix maxima, reach[i] = max(durs[i:]).
     """
-    need = dt.timedelta(minutes=need_min)
-    for ws, we in windows:
+    need = need_min
+    lo = bisect.bisect_left(ends, earliest) if ends is not None else 0
+    if durs is not None:
+        n = len(windows)
+        if lo >= n:
+            return None
+        ws, we = windows[lo]
+        s = max(ws, earliest)
+        if we - s >= need:
+            return (s, s + need)
+        # windows are merged, so every later one starts after earliest: only its length matters,
+        # and reach says up front whether any of them is long enough
+        lo += 1
+        if lo >= n or reach[lo] < need:
+            return None
+        for i in range(lo, n):
+            if durs[i] >= need:
+                s = windows[i][0]
+                return (s, s + need)
+        return None
+    for ws, we in windows[lo:] if lo else windows:
         s = max(ws, earliest)
         if require_full_coverage:
             if we - s >= need:
@@ -462,161 +613,339 @@ def _find_slot_in_windows(windows: List[Interval], earliest: dt.datetime, need_m
 
 # ============================= Decode & Evaluate =============================
 
-def decode(ctx: Context, chrom: List[Dict[str, Any]]):
-    schedule: List[Dict[str, Any]] = []
-    skipped = 0
+@dataclass
+class DecodeTables:
+    """Run-invariant inputs of decode, all on the minute axis.
+       Window values are (intervals, ends) so decode can bisect on ends; machine windows also carry
+       (durs, reach) for _find_slot_in_windows.
+       plans: (routing_id, product_id, qty, release_date) -> (start_min, steps): the batch's first possible start,
+       clamped to earliest_release, and op steps with per-machine proc times resolved (steps None = unknown routing).
+    """
+    machine_windows: Dict[str, Tuple[List[MinInterval], List[float], List[float], List[float]]]
+    operator_windows: Dict[str, Tuple[List[MinInterval], List[float]]]
+    earliest_release: float
+    plans: Dict[Tuple, Tuple[float, Optional[List[Tuple]]]]
+    machine_windows_np: Dict[str, Windows] = field(default_factory=dict)
+    operator_windows_np: Dict[str, Windows] = field(default_factory=dict)
+    # (machine_id, operator_id) -> machine ∩ operator window table, filled on first use
+    pair_windows: Dict[Tuple[str, str], Tuple] = field(default_factory=dict)
+    # decode's starting state; each decode copies these
+    machine_free0: Dict[str, float] = field(default_factory=dict)
+    machine_state0: Dict[str, int] = field(default_factory=dict)
+    operator_free0: Dict[str, float] = field(default_factory=dict)
+
+
+def _plan_key(batch: Batch) -> Tuple:
+    return (batch.routing_id, batch.product_id, batch.qty, batch.release_date)
+
+
+def _routing_steps(ctx: Context, routing: Dict[str, Any]) -> List[Tuple]:
+    """Per op: (op, next_state_idx, need_op_setup, cap_op_ids, [(machine_id, setup_by_prev, per_unit_min, so2_mult, eff, need_op_run), ...]).
+       Independent of the batch: built once per routing in Context.from_data.
+       setup_by_prev[prev_state_idx] is the resolved setup minutes (matrix entry or the op's fixed setup).
+    """
+    steps = []
+    for op in routing.get('operations', []):
+        wc_id = op['work_center_id']
+        # qualified by op name OR work center
+        cap_ops = ctx.idx_ops_by_op_name.get(op['name'].lower()) or ctx.idx_ops_by_wc.get(wc_id) or []
+        next_state = op.get('setup_state_key', 'clean')
+        per_unit_min = _get_per_unit_min(op)
+        cands = []
+        for mc in ctx.candidates_by_wc.get(wc_id, ()):
+            mid = mc['machine_id']
+            machine_eff = float(mc.get('efficiency', 1.0) or 1.0)
+            eff = machine_eff if machine_eff > 0 else 1.0
+            # setup matrix / wc fallback resolved here, once per (routing op, machine)
+            need_op_run = bool(op.get('run_requires_operator', False) or mc.get('requires_operator_for_run', False))
+            setup_by_prev = tuple(_lookup_matrix_setup_min(ctx, prev, next_state, mc, op) for prev in ctx.state_idx)
+            cands.append((mid, setup_by_prev, per_unit_min, ctx.so2.get((mid, op.get('name')), 1.0), eff, need_op_run))
+        cap_op_ids = tuple(o['operator_id'] for o in cap_ops)
+        steps.append((op, ctx.state_idx[next_state], bool(op.get('setup_requires_operator', False)), cap_op_ids, cands))
+    return steps
+
+
+def _build_plan(ctx: Context, batch: Batch) -> Optional[List[Tuple]]:
+    """Per op: (op_name, next_state_idx, need_op_setup, cap_op_ids, [(machine_id, setup_by_prev, proc_min, need_op_run), ...]).
+       ctx.routing_steps with proc minutes resolved for this batch's qty/product: per-unit minutes x qty, divided by the
+       speed overrides and machine efficiency.
+       Everything here depends on the batch only, never on the sequence, so decode looks it up instead.
+    """
+    routing_steps = ctx.routing_steps.get(batch.routing_id)
+    if routing_steps is None:
+        return None
+    qty, pid = float(batch.qty), batch.product_id
+    so3 = ctx.so3
+    steps = []
+    for op, next_state, need_op_setup, cap_op_ids, static in routing_steps:
+        op_name = op.get('name')
+        cands = [(mid, setup_by_prev, per_unit_min * qty / (so3.get((mid, pid, op_name), 1.0) * so2_mult) / eff, need_op_run)
+                 for mid, setup_by_prev, per_unit_min, so2_mult, eff, need_op_run in static]
+        steps.append((op['name'], next_state, need_op_setup, cap_op_ids, cands))
+    return steps
+
+
+def prepare_tables(ctx: Context, batches: List[Batch], days: int = 14) -> DecodeTables:
+    """Depends only on ctx and the set of batches (not their order), so one GA run computes it once."""
+    earliest_release_dt = min((b.release_date for b in batches), default=dt.datetime.now())
+    m_w, o_w = build_shift_windows_min(ctx, earliest_release_dt, days=days)
+    earliest_release = to_min(earliest_release_dt)
+    plans: Dict[Tuple, Tuple[float, Optional[List[Tuple]]]] = {}
+    for b in batches:
+        k = _plan_key(b)
+        if k not in plans:
+            plans[k] = (max(to_min(b.release_date), earliest_release), _build_plan(ctx, b))
+    return DecodeTables(
+        machine_windows={k: _machine_window_table(a, e) for k, (a, e) in m_w.items()},
+        operator_windows={k: (list(zip(a.tolist(), e.tolist())), e.tolist()) for k, (a, e) in o_w.items()},
+        earliest_release=earliest_release,
+        plans=plans,
+        machine_windows_np=m_w,
+        operator_windows_np=o_w,
+        machine_free0=dict.fromkeys(ctx.idx_machines_by_id, earliest_release),
+        machine_state0={m_id: ctx.state_idx[m.get('initial_state', 'clean')] for m_id, m in ctx.idx_machines_by_id.items()},
+        operator_free0=dict.fromkeys((op['operator_id'] for op in ctx.data.get('operators', [])), earliest_release),
+    )
+
+
+def _machine_window_table(starts: np.ndarray, ends: np.ndarray) -> Tuple[List[MinInterval], List[float], List[float], List[float]]:
+    """(intervals, ends, durs, reach) for one machine; reach[i] = max(durs[i:])."""
+    durs = ends - starts
+    reach = np.maximum.accumulate(durs[::-1])[::-1]
+    return list(zip(starts.tolist(), ends.tolist())), ends.tolist(), durs.tolist(), reach.tolist()
+
+
+def _pair_window_table(tables: DecodeTables, mid: str, op_id: str):
+    """Window table (intervals, ends, durs, reach) of machine ∩ operator windows."""
+    return _machine_window_table(*_intersect_np(tables.machine_windows_np[mid], tables.operator_windows_np[op_id]))
+
+
+def _find_slot_in_pair(pair: Tuple, est: float, need_min: float) -> Optional[MinInterval]:
+    """_find_slot_in_two over a precomputed intersection: bisect to the first piece still open after est,
+       then test later pieces by length only (they all start after est), bounded by reach.
+    """
+    wins, ends, durs, reach = pair
+    n = len(wins)
+    lo = bisect.bisect_right(ends, est)
+    if lo >= n:
+        return None
+    ps, pe = wins[lo]
+    st = est if est > ps else ps
+    if st < pe and pe - st >= need_min:
+        return (st, st + need_min)
+    lo += 1
+    if lo >= n or reach[lo] < need_min:
+        return None
+    for i in range(lo, n):
+        if durs[i] >= need_min:
+            st = wins[i][0]
+            return (st, st + need_min)
+    return None
 
-    machines_by_id = ctx.idx_machines_by_id
-    machines_by_wc = ctx.idx_machines_by_wc
-    wc_by_id = ctx.idx_wc
-    routing_by_id = ctx.idx_routings
 
-    earliest_release = min((b['release_date'] for b in chrom), default=dt.datetime.now())
+def _find_slot_in_two(m_wins: List[MinInterval], m_ends: List[float], o_wins: List[MinInterval], o_ends: List[float],
+                      est: float, need_min: float) -> Optional[MinInterval]:
+    """First slot of need_min inside machine ∩ operator windows, at or after est.
+       Both lists are merged (sorted, disjoint), so one two-pointer sweep visits the intersections in order.
+    """
+    i, j = bisect.bisect_right(m_ends, est), bisect.bisect_right(o_ends, est)
+    n_m, n_o = len(m_wins), len(o_wins)
+    while i < n_m and j < n_o:
+        ms, me = m_wins[i]
+        os_, oe = o_wins[j]
+        st = est if est > ms else ms
+        if os_ > st:
+            st = os_
+        fn = me if me < oe else oe
+        if st < fn and fn - st >= need_min:
+            return (st, st + need_min)
+        if me <= oe:
+            i += 1
+        else:
+            j += 1
+    return None
+
+
+# Numeric columns of a decoded schedule (one record per row, same order); evaluate reduces over these
+SCHED_DTYPE = np.dtype([('order_idx', 'i4'), ('start_min', 'f8'), ('finish_min', 'f8'), ('setup_min', 'f8')])
 
-    machine_windows, operator_windows = build_shift_windows(ctx, earliest_release, days=14)
 
-    machine_free: Dict[str, dt.datetime] = {m_id: earliest_release for m_id in machines_by_id.keys()}
-    machine_state: Dict[str, str] = {m_id: machines_by_id[m_id].get('initial_state', 'clean') for m_id in machines_by_id.keys()}
-    operator_free: Dict[str, dt.datetime] = {op['operator_id']: earliest_release for op in ctx.data.get('operators', [])}
+def _schedule_arrays(ctx: Context, schedule: List[Dict[str, Any]]) -> np.ndarray:
+    """SCHED_DTYPE records from schedule rows, for decoded dicts that carry no 'sched_arr'."""
+    return np.array([(ctx.order_index.get(s['order_id'], -1), (s['start'] - EPOCH).total_seconds() / 60.0,
+                      (s['finish'] - EPOCH).total_seconds() / 60.0, s.get('setup_min', 0.0)) for s in schedule],
+                    dtype=SCHED_DTYPE)
 
-    for batch in chrom:
-        routing = routing_by_id.get(batch['routing_id'])
-        if not routing:
+
+# decode(checkpoints=...) records its state before every this-many batches
+_CHECKPOINT_EVERY = 16
+
+
+def decode(ctx: Context, chrom: List[Dict[str, Any]], tables: Optional[DecodeTables] = None, rows: bool = True,
+           start: Optional[Tuple] = None, checkpoints: Optional[List[Tuple]] = None):
+    """rows=False skips the schedule dicts (and their datetimes): 'schedule' stays empty and only
+       'sched_arr' is filled, which is all evaluate needs.
+       checkpoints: list that receives (pos, machine_free, machine_state, operator_free, recs, n_recs, skipped)
+       before every _CHECKPOINT_EVERY-th batch. start: one such checkpoint from a decode with the same tables
+       whose chrom matched this one up to pos; decoding resumes there instead of replaying the prefix.
+       Both need rows=False.
+    """
+    if rows and (start is not None or checkpoints is not None):
+        raise ValueError("decode checkpoints require rows=False")
+    schedule: List[Dict[str, Any]] = []
+    recs: List[Tuple] = []   # SCHED_DTYPE rows, parallel to schedule
+    skipped = 0
+    order_index = ctx.order_index
+
+    # all time arithmetic below is in minutes since EPOCH; datetimes exist only on emitted rows
+    if tables is None:
+        tables = prepare_tables(ctx, chrom)
+    machine_windows, operator_windows = tables.machine_windows, tables.operator_windows
+    pair_windows = tables.pair_windows
+    earliest_release = tables.earliest_release
+    plans = tables.plans
+
+    first = 0
+    if start is not None:
+        first, mf, ms, of, prev_recs, n_recs, skipped = start
+        recs = prev_recs[:n_recs]
+    else:
+        mf, ms, of = tables.machine_free0, tables.machine_state0, tables.operator_free0
+    machine_free: Dict[str, float] = dict(mf)
+    machine_state: Dict[str, int] = dict(ms)
+    operator_free: Dict[str, float] = dict(of)
+
+    for pos in range(first, len(chrom)):
+        if checkpoints is not None and pos > first and pos % _CHECKPOINT_EVERY == 0:
+            # recs is only appended to, so the list plus its current length is a stable prefix
+            checkpoints.append((pos, dict(machine_free), dict(machine_state), dict(operator_free), recs, len(recs), skipped))
+        batch = chrom[pos]
+        oi = order_index.get(batch.order_id, -1)
+        key = _plan_key(batch)
+        if key not in plans:
+            plans[key] = (max(to_min(batch.release_date), earliest_release), _build_plan(ctx, batch))
+        cur_start, steps = plans[key]
+        if steps is None:
             skipped += 1
             continue
 
-        cur_start = max(batch['release_date'], earliest_release)
-
-        for op in routing.get('operations', []):
-            wc_id = op['work_center_id']
-            candidates = list(machines_by_wc.get(wc_id, []))
-            if not candidates:
-                wc = wc_by_id.get(wc_id)
-                if wc:
-                    ids = set(wc.get('parallel_machines', []))
-                    candidates = [machines_by_id[mid] for mid in ids if mid in machines_by_id]
-            if not candidates:
+        for op_name, next_state, need_op_setup, cap_op_ids, cands in steps:
+            if not cands:
                 skipped += 1
                 break
 
-            best: Optional[Dict[str, Any]] = None
-            for mc in candidates:
-                mid = mc['machine_id']
-                est = max(cur_start, machine_free[mid])
+            best: Optional[Tuple] = None
+            best_fn = 0.0
+            best_ci = 0
+            who_id: Optional[str] = None   # operator choice does not depend on the machine
+            # (machine est, setup, need) per candidate, resolved once for both the bound and the slot search.
+            # The slot starts no earlier than est, so fn >= est + need: visit in bound order and stop once
+            # a bound exceeds the best finish (no later candidate can win or tie).
+            evs = []
+            for mid, setup_by_prev, proc_min, _ in cands:
+                setup_min = setup_by_prev[machine_state[mid]]
+                evs.append((max(cur_start, machine_free[mid]), setup_min, setup_min + proc_min))
+            if len(cands) > 1:
+                lbs = [e[0] + e[2] for e in evs]
+                order = sorted(range(len(cands)), key=lbs.__getitem__)
+            else:
+                lbs, order = None, (0,)
+            for ci in order:
+                if best is not None and lbs[ci] > best_fn:
+                    break
+                mid, _, proc_min, need_op_run = cands[ci]
+                est, setup_min, need_min = evs[ci]
 
                 # operator requirement
-                need_op_setup = bool(op.get('setup_requires_operator', False))
-                need_op_run = bool(op.get('run_requires_operator', False) or mc.get('requires_operator_for_run', False))
                 assigned_op = None
-                op_wins: List[Interval] = []
-
-                if (need_op_setup or need_op_run) and ctx.data.get('operators'):
-                    # qualified by op name OR work center
-                    cap_ops = [o for o in ctx.data['operators'] if op['name'].lower() in [s.lower() for s in (o.get('skills', []) or [])]]
-                    if not cap_ops:
-                        cap_ops = [o for o in ctx.data['operators'] if wc_id in (o.get('assignable_to', []) or [])]
-                    if cap_ops:
-                        who = min(cap_ops, key=lambda x: operator_free[x['operator_id']])
-                        assigned_op = who['operator_id']
-                        est = max(est, operator_free[assigned_op])
-                        op_wins = operator_windows.get(assigned_op, [])
-
-                prev_state = machine_state.get(mid, mc.get('initial_state', 'clean'))
-                next_state = op.get('setup_state_key', 'clean')
-                setup_min = _lookup_matrix_setup_min(ctx, prev_state, next_state, mc, op)
-                machine_eff = float(mc.get('efficiency', 1.0) or 1.0)
-                proc_min  = _get_proc_time_min(ctx, op, batch['qty'], machine_id=mid, product_id=batch['product_id'], machine_eff=machine_eff)
-                need_min  = setup_min + proc_min
-
-                m_wins = machine_windows.get(mid, [(est, est + dt.timedelta(days=365))])
+                op_wins: List[MinInterval] = []
+                op_ends: List[float] = []
+                if (need_op_setup or need_op_run) and cap_op_ids:
+                    if who_id is None:
+                        who_id = min(cap_op_ids, key=operator_free.__getitem__)
+                    assigned_op = who_id
+                    est = max(est, operator_free[assigned_op])
+                    op_wins, op_ends = operator_windows.get(assigned_op, ([], []))
+
+                m_wins, m_ends, m_durs, m_reach = (machine_windows.get(mid)
+                                                   or ([(est, est + 365 * 1440)], [est + 365 * 1440], None, None))
 
                 # intersect machine ⨉ operator windows if needed
-                wins_to_search: List[Interval] = []
-                if op_wins and (need_op_setup or need_op_run):
-                    for mw_s, mw_e in m_wins:
-                        earliest = max(est, mw_s)
-                        for ow_s, ow_e in op_wins:
-                            start_candidate = max(earliest, ow_s)
-                            end_candidate   = min(mw_e, ow_e)
-                            if start_candidate < end_candidate:
-                                wins_to_search.append((start_candidate, end_candidate))
+                if op_wins:
+                    if m_durs is None:   # machine without calendar windows
+                        slot = _find_slot_in_two(m_wins, m_ends, op_wins, op_ends, est, need_min)
+                    else:
+                        pair = pair_windows.get((mid, assigned_op))
+                        if pair is None:
+                            pair = pair_windows[(mid, assigned_op)] = _pair_window_table(tables, mid, assigned_op)
+                        slot = _find_slot_in_pair(pair, est, need_min)
                 else:
-                    wins_to_search = [(max(est, a), b) for (a, b) in m_wins]
-
-                slot = _find_slot_in_windows(wins_to_search, est, need_min, require_full_coverage=need_op_run)
+                    slot = _find_slot_in_windows(m_wins, est, need_min, require_full_coverage=need_op_run, ends=m_ends,
+                                                 durs=m_durs, reach=m_reach)
                 if not slot:
                     continue
 
                 st, fn = slot
-                cand = {
+                # ties go to the earlier candidate in declared order, as with an in-order scan
+                if (best is None) or (fn < best_fn) or (fn == best_fn and ci < best_ci):
+                    best = (mid, st, fn, assigned_op, setup_min, proc_min)
+                    best_fn, best_ci = fn, ci
+
+            if best is None:
+                skipped += 1
+                break
+
+            mid, st, fn, assigned_op, setup_min, proc_min = best
+            if rows:
+                schedule.append({
+                    'order_id': batch.order_id,
+                    'product_id': batch.product_id,
+                    'routing_id': batch.routing_id,
+                    'operation': op_name,
+                    'qty': batch.qty,
                     'machine': mid,
-                    'start': st,
-                    'finish': fn,
+                    'start': from_min(st),
+                    'finish': from_min(fn),
                     'operator': assigned_op,
                     'setup_min': setup_min,
                     'proc_min': proc_min
-                }
-                if (best is None) or (fn < best['finish']):
-                    best = cand
+                })
+            recs.append((oi, st, fn, setup_min))
 
-            if best is None:
-                skipped += 1
-                break
+            machine_free[mid] = fn
+            machine_state[mid] = next_state
+            if assigned_op:
+                operator_free[assigned_op] = fn
+            cur_start = fn
 
-            schedule.append({
-                'order_id': batch['order_id'],
-                'product_id': batch['product_id'],
-                'routing_id': batch['routing_id'],
-                'operation': op['name'],
-                'qty': batch['qty'],
-                'machine': best['machine'],
-                'start': best['start'],
-                'finish': best['finish'],
-                'operator': best['operator'],
-                'setup_min': best['setup_min'],
-                'proc_min': best['proc_min']
-            })
-
-            machine_free[best['machine']] = best['finish']
-            machine_state[best['machine']] = op.get('setup_state_key', 'clean')
-            if best['operator']:
-                operator_free[best['operator']] = best['finish']
-            cur_start = best['finish']
-
-    return {'schedule': schedule, 'skipped': skipped}
+    return {'schedule': schedule, 'skipped': skipped, 'sched_arr': np.array(recs, dtype=SCHED_DTYPE)}
 
 
 def evaluate(ctx: Context, decoded: Dict[str, Any]) -> float:
-    schedule = decoded['schedule']
+    """Reads 'sched_arr' when present (decode always sets it), else builds it from 'schedule'."""
     skipped = decoded.get('skipped', 0)
+    arr = decoded.get('sched_arr')
+    if arr is None:
+        arr = _schedule_arrays(ctx, decoded['schedule'])
 
-    if not schedule:
+    if not len(arr):
         return 1e12 + 1e9 * skipped
 
-    makespan = max(s['finish'] for s in schedule)
-    start0 = min(s['start'] for s in schedule)
+    finish = arr['finish_min']
+    makespan_min = float(finish.max() - arr['start_min'].min())
 
-    # tardiness by order (use last finish per order)
-    last_finish_by_order: Dict[str, dt.datetime] = {}
-    for s in schedule:
-        last_finish_by_order[s['order_id']] = max(last_finish_by_order.get(s['order_id'], s['finish']), s['finish'])
+    # tardiness by order (use last finish per order); orders without a due date (idx -1) are ignored
+    oi = arr['order_idx']
+    known = oi >= 0
+    last_finish = np.full(len(ctx.due_min_per_order), -np.inf)
+    np.maximum.at(last_finish, oi[known], finish[known])
+    tardiness_min = float(np.maximum(last_finish - ctx.due_min_per_order, 0.0).sum())
 
-    tardiness_min = 0.0
-    all_orders = list(ctx.data.get('orders', [])) + list(ctx.data.get('orders_multiline', []))
-    due_by_order = {o['order_id']: parse_datetime(o['due_date']) for o in all_orders}
-    for oid, fin in last_finish_by_order.items():
-        due = due_by_order.get(oid)
-        if not due:
-            continue
-        delay = max((fin - due).total_seconds() / 60.0, 0.0)
-        tardiness_min += delay
-
-    w = (ctx.settings or {}).get('objective_weights', {})
     obj = 0.0
-    obj += w.get('makespan', 1.0) * ((makespan - start0).total_seconds() / 60.0)
-    obj += w.get('tardiness', 10.0) * tardiness_min
-    setup_cost = sum(s.get('setup_min', 0.0) for s in schedule)
-    obj += w.get('setup_cost', 5.0) * setup_cost
+    obj += ctx.w_make * makespan_min
+    obj += ctx.w_tard * tardiness_min
+    setup_cost = float(arr['setup_min'].sum())
+    obj += ctx.w_setup * setup_cost
 
     # heavy penalty on skipped ops
     obj += 1e6 * skipped
@@ -624,89 +953,295 @@ def evaluate(ctx: Context, decoded: Dict[str, Any]) -> float:
 
 
 # ============================= GA + Local Search =============================
+# A chromosome is an np.int32 permutation of indices into the run's batches; decode gets the batch
+# list only when it actually runs.
+
+def chrom_signature(chrom: np.ndarray) -> bytes:
+    """Order-identity of a chromosome; decode depends only on ctx + batches + this permutation."""
+    return chrom.tobytes()
+
 
-def random_chromosome(batches: List[Dict[str, Any]]):
-    chrom = deepcopy(batches)
-    random.shuffle(chrom)
-    return chrom
+def _chrom_batches(batches: List[Batch], chrom: np.ndarray) -> List[Batch]:
+    return [batches[i] for i in chrom.tolist()]
 
 
-def crossover(p1, p2):
-    if len(p1) < 2 or len(p2) < 2:
-        return deepcopy(p1)
+def objective(ctx: Context, batches: List[Batch], chrom: np.ndarray, cache: Optional[Dict[bytes, float]] = None,
+              sig: Optional[bytes] = None, tables: Optional[DecodeTables] = None, start: Optional[Tuple] = None,
+              checkpoints: Optional[List[Tuple]] = None) -> float:
+    """evaluate(decode(...)) memoized per signature within one GA run (one ctx and batches).
+       tables: prepare_tables(...) result shared across the run.
+       start/checkpoints: passed to decode when it actually runs (a cache hit records no checkpoints).
+    """
+    if cache is None:
+        return evaluate(ctx, decode(ctx, _chrom_batches(batches, chrom), tables, rows=False, start=start,
+                                    checkpoints=checkpoints))
+    if sig is None:
+        sig = chrom_signature(chrom)
+    obj = cache.get(sig)
+    if obj is None:
+        obj = cache[sig] = evaluate(ctx, decode(ctx, _chrom_batches(batches, chrom), tables, rows=False, start=start,
+                                                checkpoints=checkpoints))
+    return obj
+
+
+def random_chromosome(batches: List[Batch]) -> np.ndarray:
+    perm = list(range(len(batches)))
+    random.shuffle(perm)
+    return np.array(perm, dtype=np.int32)
+
+
+def crossover(p1: np.ndarray, p2: np.ndarray, rng=random) -> np.ndarray:
     n = len(p1)
-    a, b = sorted(random.sample(range(n), 2))
-    child = [None]*n
-    child[a:b+1] = deepcopy(p1[a:b+1])
-
-    def key(b):
-        return (b['order_id'], b['product_id'], b['qty'], b['routing_id'], b['release_date'].isoformat(), b['due_date'].isoformat())
-
-    used = set(key(x) for x in child[a:b+1] if x is not None)
-    idx = (b+1) % n
-    for item in p2:
-        k = key(item)
-        if k in used:
-            continue
-        while child[idx] is not None:
-            idx = (idx + 1) % n
-        child[idx] = deepcopy(item)
+    if n < 2 or len(p2) < 2:
+        return p1.copy()
+    a, b = sorted(rng.sample(range(n), 2))
+    child = np.empty(n, dtype=np.int32)
+    child[a:b+1] = p1[a:b+1]
+
+    # OX: p2's remaining indices, in p2 order, fill after the window and wrap to the front
+    taken = np.zeros(n, dtype=bool)
+    taken[p1[a:b+1]] = True
+    rest = p2[~taken[p2]]
+    k = n - (b + 1)
+    child[b+1:] = rest[:k]
+    child[:a] = rest[k:k + a]
     return child
 
 
-def mutate(chrom, rate=0.2):
-    c = deepcopy(chrom)
-    n = len(c)
-    swaps = max(1, int(rate * n))
-    for _ in range(swaps):
-        i, j = random.randrange(n), random.randrange(n)
+def _apply_swaps(chrom: np.ndarray, ii, jj) -> np.ndarray:
+    # one pair at a time: overlapping pairs must compose like sequential swaps, which fancy indexing does not
+    c = chrom.tolist()
+    for i, j in zip(ii, jj):
         c[i], c[j] = c[j], c[i]
-    return c
+    return np.array(c, dtype=np.int32)
+
+
+def mutate(chrom: np.ndarray, rate=0.2, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Random swaps; all swap indices come from one rng.integers draw."""
+    rng = rng if rng is not None else np.random.default_rng()
+    swaps = max(1, int(rate * len(chrom)))
+    ii, jj = rng.integers(0, len(chrom), size=(2, swaps)).tolist()
+    return _apply_swaps(chrom, ii, jj)
 
 
-def local_search(ctx: Context, chrom, iterations=50, tabu_size=10, temp_start=1000):
-    best_chrom = deepcopy(chrom)
-    best_obj = evaluate(ctx, decode(ctx, best_chrom))
-    tabu: List[Tuple] = []
+def local_search(ctx: Context, batches: List[Batch], chrom: np.ndarray, iterations=50, tabu_size=10, temp_start=1000,
+                 cache: Optional[Dict[bytes, float]] = None, tables: Optional[DecodeTables] = None,
+                 rng: Optional[np.random.Generator] = None, patience: Optional[int] = None):
+    """Tabu + simulated-annealing walk from chrom; returns the final (chrom, objective).
+       patience: stop after this many consecutive iterations without a strict improvement (None = run all).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    best_chrom = chrom
+    # checkpoints of best_chrom's decode (only valid against one shared tables): a neighbor resumes
+    # from the last one at or before its first changed position instead of replaying that prefix
+    base_cps: Optional[List[Tuple]] = [] if tables is not None else None
+    best_obj = objective(ctx, batches, best_chrom, cache, tables=tables, checkpoints=base_cps)
+    tabu_q: deque = deque(maxlen=max(tabu_size, 0))   # FIFO order for eviction
+    tabu_set: set = set()                     # O(1) membership
     temp = temp_start
     alpha = 0.95
+    since_improve = 0
     for _ in range(iterations):
-        neighbor = mutate(best_chrom, rate=0.3)
-        sig = tuple((x['order_id'], x['product_id'], x['qty']) for x in neighbor)
-        if sig in tabu:
+        if patience is not None and since_improve >= patience:
+            break
+        since_improve += 1
+        neighbor = mutate(best_chrom, rate=0.3, rng=rng)
+        sig = chrom_signature(neighbor)
+        if sig in tabu_set:
             continue
-        obj = evaluate(ctx, decode(ctx, neighbor))
+        nb_cps = start = None
+        if base_cps is not None:
+            diff = np.flatnonzero(neighbor != best_chrom)
+            d = int(diff[0]) if len(diff) else len(neighbor)
+            nb_cps = base_cps[:d // _CHECKPOINT_EVERY]   # base_cps[i] sits at position (i+1)*_CHECKPOINT_EVERY
+            start = nb_cps[-1] if nb_cps else None
+        obj = objective(ctx, batches, neighbor, cache, sig, tables, start=start, checkpoints=nb_cps)
         delta = obj - best_obj
-        if delta < 0 or random.random() < math.exp(-delta / temp):
+        if delta < 0:
+            since_improve = 0
+        if delta < 0 or rng.random() < math.exp(-delta / temp):
             best_chrom = neighbor
             best_obj = obj
-            tabu.append(sig)
-            if len(tabu) > tabu_size:
-                tabu.pop(0)
+            base_cps = nb_cps
+            if tabu_size > 0:
+                if len(tabu_q) == tabu_size:
+                    tabu_set.discard(tabu_q[0])
+                tabu_q.append(sig)
+                tabu_set.add(sig)
         temp *= alpha
-    return best_chrom
+    return best_chrom, best_obj
 
 
-def ga_scheduler(ctx: Context, batches, population=30, generations=20):
-    pop = [random_chromosome(batches) for _ in range(population)]
-    best_chrom = pop[0]
-    best_obj = evaluate(ctx, decode(ctx, best_chrom))
-    for gen in range(generations):
+# ---- worker side: each process keeps its own ctx/tables/cache, set once by the pool initializer ----
+_W_CTX: Optional[Context] = None
+_W_BATCHES: List[Batch] = []
+_W_TABLES: Optional[DecodeTables] = None
+_W_CACHE: Dict[bytes, float] = {}
+
+
+def _init_worker(ctx: Context, batches, tables):
+    global _W_CTX, _W_BATCHES, _W_TABLES, _W_CACHE
+    _W_CTX, _W_BATCHES, _W_TABLES, _W_CACHE = ctx, batches, tables, {}
+
+
+def _ls_and_eval(task):
+    """(chrom, seed) -> (chrom, objective) after local search."""
+    chrom, seed = task
+    return local_search(_W_CTX, _W_BATCHES, chrom, iterations=20, tabu_size=5, cache=_W_CACHE, tables=_W_TABLES,
+                        rng=np.random.default_rng(seed))
+
+
+def _eval_chrom(chrom):
+    """chrom -> objective in a worker."""
+    return objective(_W_CTX, _W_BATCHES, chrom, _W_CACHE, tables=_W_TABLES)
+
+
+def evaluate_population(ctx: Context, batches, population, *, tables: Optional[DecodeTables] = None,
+                        cache: Optional[Dict[bytes, float]] = None, executor: Optional[ProcessPoolExecutor] = None,
+                        n_workers: Optional[int] = None) -> List[float]:
+    """Objective per chromosome (each a permutation of batch indices), in population order.
+       Chromosomes missing from cache are decoded in a process pool: executor (initialized with
+       _init_worker over the same batches, as in ga_scheduler) or a temporary pool of n_workers
+       (None = os.cpu_count()). Runs in-process when n_workers is 1 or there are too few to pay for IPC.
+    """
+    if cache is None:
+        cache = {}
+    if tables is None:
+        tables = prepare_tables(ctx, batches)
+    n_workers = n_workers or os.cpu_count() or 1
+    sigs = [chrom_signature(c) for c in population]
+    pending: Dict[bytes, np.ndarray] = {}
+    for sig, c in zip(sigs, population):
+        if sig not in cache and sig not in pending:
+            pending[sig] = c
+    if n_workers > 1 and (executor is not None or len(pending) >= 2 * n_workers):
+        chroms = list(pending.values())
+        own = executor is None
+        if own:
+            executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                           initargs=(ctx, batches, tables))
+        try:
+            objs = executor.map(_eval_chrom, chroms, chunksize=max(1, len(chroms) // (4 * n_workers)))
+            cache.update(zip(pending, objs))
+        finally:
+            if own:
+                executor.shutdown()
+    else:
+        for sig, c in pending.items():
+            objective(ctx, batches, c, cache, sig, tables)
+    return [cache[sig] for sig in sigs]
+
+
+def tournament(pop: List[Tuple[np.ndarray, float]], k: int = 3, rng=random):
+    """Best of k random (chrom, obj) entries."""
+    return min(rng.sample(pop, min(k, len(pop))), key=lambda x: x[1])[0]
+
+
+def _next_generation(ctx: Context, batches, pop: List[Tuple[np.ndarray, float]], *, cache: Dict[bytes, float],
+                     tables: DecodeTables, executor: Optional[ProcessPoolExecutor] = None, n_workers: int = 1,
+                     rng=random) -> List[Tuple[np.ndarray, float]]:
+    """One generation: the best ~10% survive unchanged, the rest are tournament children after local search.
+       Children's local searches run on executor when given, else in-process; each gets its own seed from rng.
+    """
+    population = len(pop)
+    n_elite = max(1, population // 10)
+    elites = sorted(pop, key=lambda x: x[1])[:n_elite]
+    np_rng = np.random.default_rng(rng.getrandbits(64))   # seeded from rng, which stays the only source
+    children = []
+    for _ in range(population - n_elite):
+        p1, p2 = tournament(pop, rng=rng), tournament(pop, rng=rng)
+        child = crossover(p1, p2, rng=rng)
+        child = mutate(child, rng=np_rng)
+        children.append(child)
+    seeds = [rng.getrandbits(64) for _ in children]
+    if executor is not None:
+        tasks = list(zip(children, seeds))
         new_pop = []
-        for _ in range(population):
-            p1, p2 = random.sample(pop, 2)
-            child = crossover(p1, p2)
-            child = mutate(child)
-            child = local_search(ctx, child, iterations=20, tabu_size=5)
-            new_pop.append(child)
-        for chrom in new_pop:
-            obj = evaluate(ctx, decode(ctx, chrom))
-            if obj < best_obj:
-                best_chrom = chrom
-                best_obj = obj
-        pop = new_pop
-        print(f"Generation {gen+1}/{generations}, best_obj={best_obj:.2f}")
-    decoded = decode(ctx, best_chrom)
+        for chrom, obj in executor.map(_ls_and_eval, tasks, chunksize=max(1, len(tasks) // (4 * n_workers))):
+            cache[chrom_signature(chrom)] = obj
+            new_pop.append((chrom, obj))
+    else:
+        new_pop = [local_search(ctx, batches, c, iterations=20, tabu_size=5, cache=cache, tables=tables,
+                                rng=np.random.default_rng(sd))
+                   for c, sd in zip(children, seeds)]
+    return elites + new_pop
+
+
+def _evolve_island(ctx: Context, batches, pop, generations: int, seed: int, cache: Dict[bytes, float],
+                   tables: DecodeTables) -> List[Tuple[np.ndarray, float]]:
+    rng = random.Random(seed)
+    for _ in range(generations):
+        pop = _next_generation(ctx, batches, pop, cache=cache, tables=tables, rng=rng)
+    return pop
+
+
+def _evolve_island_task(task):
+    """(pop, generations, seed) -> pop, evolved in a worker without further IPC."""
+    pop, generations, seed = task
+    return _evolve_island(_W_CTX, _W_BATCHES, pop, generations, seed, _W_CACHE, _W_TABLES)
+
+
+def ga_scheduler(ctx: Context, batches, population=30, generations=20, n_workers: Optional[int] = None,
+                 islands: int = 1, migration_interval: int = 5, migrants: int = 1):
+    """n_workers: processes for local search (None = os.cpu_count(), 1 = in-process).
+       Each child's local search gets its own seeded RNG, so results do not depend on n_workers.
+       The best ~10% of each generation survive unchanged; parents come from 3-way tournaments.
+       islands > 1: population is split into that many islands that evolve independently (one pool task
+       each) for migration_interval generations at a time; then each island's best `migrants` replace the
+       worst of the next island in a ring. Each island has its own seeded RNG, so this too is independent
+       of n_workers.
+    """
+    cache: Dict[bytes, float] = {}   # signature -> objective, valid for this run's ctx and batches only
+    tables = prepare_tables(ctx, batches)   # every chromosome is a permutation of batches
+    n_workers = n_workers or os.cpu_count() or 1
+    executor = None
+    if n_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                       initargs=(ctx, batches, tables))
+
+    islands = max(1, min(islands, population // 2))
+    pop = [random_chromosome(batches) for _ in range(population)]
+    pop = list(zip(pop, evaluate_population(ctx, batches, pop, tables=tables, cache=cache,
+                                            executor=executor, n_workers=n_workers)))   # (chrom, obj) pairs
+    best_chrom, best_obj = min(pop, key=lambda x: x[1])
+    try:
+        if islands == 1:
+            for gen in range(generations):
+                pop = _next_generation(ctx, batches, pop, cache=cache, tables=tables, executor=executor,
+                                       n_workers=n_workers)
+                for chrom, obj in pop:
+                    if obj < best_obj:
+                        best_chrom = chrom
+                        best_obj = obj
+                print(f"Generation {gen+1}/{generations}, best_obj={best_obj:.2f}")
+        else:
+            pops = [pop[i::islands] for i in range(islands)]
+            done = 0
+            while done < generations:
+                gens = min(max(1, migration_interval), generations - done)
+                tasks = [(p, gens, random.getrandbits(64)) for p in pops]
+                if executor is not None:
+                    pops = list(executor.map(_evolve_island_task, tasks))
+                else:
+                    pops = [_evolve_island(ctx, batches, p, g, sd, cache, tables) for p, g, sd in tasks]
+                done += gens
+                for p in pops:
+                    for chrom, obj in p:
+                        if obj < best_obj:
+                            best_chrom = chrom
+                            best_obj = obj
+                if done < generations and migrants > 0:
+                    # ring migration: island i's worst are replaced by copies of island i-1's best
+                    ranked = [sorted(p, key=lambda x: x[1]) for p in pops]
+                    pops = []
+                    for i, p in enumerate(ranked):
+                        m = min(migrants, len(p) - 1)
+                        pops.append(p[:len(p) - m] + ranked[i - 1][:m])
+                print(f"Generation {done}/{generations}, best_obj={best_obj:.2f}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    decoded = decode(ctx, _chrom_batches(batches, best_chrom), tables)
     return decoded['schedule']
 
 
@@ -719,13 +1254,112 @@ def to_printable_row(s: Dict[str, Any]):
         "operation": s['operation'],
         "qty": s['qty'],
         "machine": s['machine'],
-        "start": s['start'].strftime("%Y-%m-%d %H:%M"),
-        "finish": s['finish'].strftime("%Y-%m-%d %H:%M"),
+        "start": fmt_minute(s['start']),
+        "finish": fmt_minute(s['finish']),
         "setup_min": round(s.get('setup_min', 0.0), 2),
         "proc_min": round(s.get('proc_min', 0.0), 2),
     }
 
 
+MACHINE_REPORT_HEADER = ["order_id","product_id","operation","qty","start","finish","setup_min","proc_min","duration_min"]
+_REPORT_DTYPE = [("start", "i8"), ("finish", "i8"), ("duration_min", "f8")]
+
+
+def _report_min(ts: str) -> int:
+    """Fixed "YYYY-MM-DD HH:MM" (fmt_minute output) -> integer minutes; slices instead of strptime."""
+    return dt.date(int(ts[0:4]), int(ts[5:7]), int(ts[8:10])).toordinal() * 1440 + int(ts[11:13]) * 60 + int(ts[14:16])
+
+
+def group_by_machine(schedule: List[Dict[str, Any]]):
+    """Printable rows per machine (schedule order), with _start_min/_finish_min parsed once.
+       Also returns machine_id -> [busy_min, first_start_min, last_finish_min], accumulated in the same pass.
+    """
+    by_machine: Dict[str, List[Dict[str, Any]]] = {}
+    agg: Dict[str, List[float]] = {}
+    for r in schedule:
+        dur_min = r.get("setup_min", 0.0) + r.get("proc_min", 0.0)
+        start, finish = fmt_minute(r["start"]), fmt_minute(r["finish"])
+        row = {
+            "order_id": r["order_id"],
+            "product_id": r["product_id"],
+            "operation": r["operation"],
+            "qty": r["qty"],
+            "start": start,
+            "finish": finish,
+            "setup_min": round(r.get("setup_min", 0.0), 2),
+            "proc_min": round(r.get("proc_min", 0.0), 2),
+            "duration_min": round(dur_min, 2),
+            "_start_min": _report_min(start),
+            "_finish_min": _report_min(finish),
+        }
+        by_machine.setdefault(r["machine"], []).append(row)
+        a = agg.get(r["machine"])
+        if a is None:
+            agg[r["machine"]] = [row["duration_min"], row["_start_min"], row["_finish_min"]]
+        else:
+            a[0] += row["duration_min"]
+            if row["_start_min"] < a[1]:
+                a[1] = row["_start_min"]
+            if row["_finish_min"] > a[2]:
+                a[2] = row["_finish_min"]
+    return by_machine, agg
+
+
+def _report_array(rows: List[Dict[str, Any]]) -> np.ndarray:
+    # SoA view of a machine's rows for sorting; string fields stay on the row dicts
+    return np.array([(r["_start_min"], r["_finish_min"], r["duration_min"]) for r in rows], dtype=_REPORT_DTYPE)
+
+
+def machine_utilization(agg: Dict[str, List[float]]) -> Dict[str, Tuple[float, float, float]]:
+    """machine_id -> (busy_min, horizon_min, util), in machine id order, from group_by_machine's aggregates."""
+    res: Dict[str, Tuple[float, float, float]] = {}
+    for m_id in sorted(agg):
+        busy_min, first, last = agg[m_id]
+        horizon_min = float(last - first)
+        res[m_id] = (busy_min, horizon_min, (busy_min / horizon_min) if horizon_min > 0 else 0.0)
+    return res
+
+
+def write_machine_schedules(out, by_machine: Dict[str, List[Dict[str, Any]]]):
+    """CSV block per machine (rows by start) into a text stream."""
+    writer = csv.writer(out, lineterminator="\n")
+    row_get = itemgetter(*MACHINE_REPORT_HEADER)
+    for m_id in sorted(by_machine):
+        rows = by_machine[m_id]
+        order = np.argsort(_report_array(rows)["start"], kind="stable") if rows else []
+        out.write(f"\n--- Machine: {m_id} ---\n")
+        writer.writerow(MACHINE_REPORT_HEADER)
+        writer.writerows(row_get(rows[i]) for i in order)
+
+
+def format_report(schedule: List[Dict[str, Any]], *, final: bool = True, machines: bool = True, utilization: bool = True) -> str:
+    """Console report text; headless callers can skip sections (or call machine_utilization directly)."""
+    out = io.StringIO()
+    if final:
+        out.write("\n=== FINAL SCHEDULE (console only) ===\n")
+        printable = [to_printable_row(r) for r in schedule]
+        if printable:
+            headers = list(printable[0].keys())
+            getter = itemgetter(*headers)
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(headers)
+            writer.writerows(getter(r) for r in printable)
+        else:
+            out.write("(empty)\n")
+    if not (machines or utilization):
+        return out.getvalue()
+
+    by_machine, agg = group_by_machine(schedule)
+    if machines:
+        out.write("\n=== MACHINE SCHEDULES (console only) ===\n")
+        write_machine_schedules(out, by_machine)
+    if utilization:
+        out.write("\n=== MACHINE UTILIZATION (rough; console only) ===\n")
+        out.write("".join(f"{m_id}: busy={b:.1f} min, horizon={h:.1f} min, util={u*100:.1f}%\n"
+                          for m_id, (b, h, u) in machine_utilization(agg).items()))
+    return out.getvalue()
+
+
 # ============================= Main =============================
 if __name__ == "__main__":
     random.seed(42)
@@ -741,52 +1375,5 @@ if __name__ == "__main__":
 
     final_schedule = ga_scheduler(ctx, batches, population=20, generations=10)
 
-    print("\n=== FINAL SCHEDULE (console only) ===")
-    printable = [to_printable_row(r) for r in final_schedule]
-    if printable:
-        headers = list(printable[0].keys())
-        print(",".join(headers))
-        for r in printable:
-            print(",".join(str(r[h]) for h in headers))
-    else:
-        print("(empty)")
-
-    from collections import defaultdict
-    by_machine: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-    for r in final_schedule:
-        dur_min = r.get("setup_min", 0.0) + r.get("proc_min", 0.0)
-        by_machine[r["machine"]].append({
-            "order_id": r["order_id"],
-            "product_id": r["product_id"],
-            "operation": r["operation"],
-            "qty": r["qty"],
-            "start": r["start"].strftime("%Y-%m-%d %H:%M"),
-            "finish": r["finish"].strftime("%Y-%m-%d %H:%M"),
-            "setup_min": round(r.get("setup_min", 0.0), 2),
-            "proc_min": round(r.get("proc_min", 0.0), 2),
-            "duration_min": round(dur_min, 2)
-        })
-
-    print("\n=== MACHINE SCHEDULES (console only) ===")
-    def _p(ts: str):
-        return dt.datetime.strptime(ts, "%Y-%m-%d %H:%M")
-
-    for m_id, rows in sorted(by_machine.items()):
-        rows.sort(key=lambda x: _p(x["start"]))
-        print(f"\n--- Machine: {m_id} ---")
-        header = ["order_id","product_id","operation","qty","start","finish","setup_min","proc_min","duration_min"]
-        print(",".join(header))
-        for r in rows:
-            print(",".join(str(r[h]) for h in header))
-
-    print("\n=== MACHINE UTILIZATION (rough; console only) ===")
-    for m_id, rows in sorted(by_machine.items()):
-        rows_sorted = sorted(rows, key=lambda x: _p(x["start"]))
-        if not rows_sorted:
-            continue
-        first_start = _p(rows_sorted[0]["start"])
-        last_finish = _p(rows_sorted[-1]["finish"])
-        horizon_min = (last_finish - first_start).total_seconds()/60.0
-        busy_min = sum(r["duration_min"] for r in rows_sorted)
-        util = (busy_min / horizon_min) if horizon_min > 0 else 0.0
-        print(f"{m_id}: busy={busy_min:.1f} min, horizon={horizon_min:.1f} min, util={util*100:.1f}%")
+    # the whole report is assembled first and written to stdout once
+    sys.stdout.write(format_report(final_schedule))
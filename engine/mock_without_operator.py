@@ -8,11 +8,16 @@
 #  - fallback horizon: ถ้า skipped ยังสูง ลองขยาย horizon +7 / +14 วันอัตโนมัติ
 # -------------------------------------------------------------
 from __future__ import annotations
-import json, os, math, random, datetime as dt
-from dataclasses import dataclass
+import csv, json, os, sys, math, random, datetime as dt
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Tuple, Optional
-from copy import deepcopy
-from collections import defaultdict
+from collections import defaultdict, deque
+from functools import lru_cache
+from bisect import bisect_right
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 # ============================= Utilities =============================
 
@@ -21,6 +26,14 @@ def parse_datetime(s) -> dt.datetime:
         return s
     if not s:
         raise ValueError("Empty datetime value")
+    return _parse_datetime_str(str(s))
+
+@lru_cache(maxsize=8192)
+def _parse_datetime_str(s: str) -> dt.datetime:
+    # due/release/OT/holiday มักซ้ำกัน → cache ตาม string (parse ไม่ผ่านจะ raise และไม่ถูก cache)
+    d = _parse_iso_fast(s)
+    if d is not None:
+        return d
     fmts = [
         "%Y-%m-%dT%H:%M:%S%z",
         "%Y-%m-%dT%H:%M:%S",
@@ -30,7 +43,7 @@ def parse_datetime(s) -> dt.datetime:
     last_err = None
     for f in fmts:
         try:
-            d = dt.datetime.strptime(str(s), f)
+            d = dt.datetime.strptime(s, f)
             if d.tzinfo:
                 d = d.astimezone(dt.timezone.utc).replace(tzinfo=None)
             return d
@@ -39,6 +52,28 @@ def parse_datetime(s) -> dt.datetime:
             continue
     raise ValueError(f"Cannot parse datetime: {s!r}. Last error: {last_err}")
 
+def _parse_iso_fast(s: str) -> Optional[dt.datetime]:
+    # ทางลัดสำหรับรูปแบบที่เจอบ่อย: YYYY-MM-DD / YYYY-MM-DD HH:MM / YYYY-MM-DDTHH:MM:SS
+    # ตัด slice แล้วเรียก constructor ตรง ๆ ไม่ต้องลอง strptime ทีละ format; ไม่เข้ารูป → None
+    n = len(s)
+    if n not in (10, 16, 19) or s[4] != '-' or s[7] != '-':
+        return None
+    if n == 16 and (s[10] != ' ' or s[13] != ':'):
+        return None
+    if n == 19 and (s[10] != 'T' or s[13] != ':' or s[16] != ':'):
+        return None
+    parts = [s[0:4], s[5:7], s[8:10]]
+    if n >= 16:
+        parts += [s[11:13], s[14:16]]
+    if n == 19:
+        parts.append(s[17:19])
+    if not all(x.isdigit() for x in parts):
+        return None
+    try:
+        return dt.datetime(*map(int, parts))
+    except ValueError:
+        return None
+
 def timedelta_minutes(m: float) -> dt.timedelta:
     return dt.timedelta(seconds=float(m) * 60.0)
 
@@ -71,6 +106,41 @@ def index_machines(machines: List[Dict[str, Any]]):
 def index_setup_mats(setup_matrices: List[Dict[str, Any]]):
     return {m['setup_matrix_id']: m for m in setup_matrices} if setup_matrices else {}
 
+def index_setup_states(data: Dict[str, Any], setup_mats: Dict[str, Any]):
+    # ชื่อ state -> index (intern เป็น int) + setup matrix แต่ละตัวเป็น float64 [prev, next] (NaN = ไม่มีค่า)
+    states: Dict[Any, int] = {'clean': 0}
+    for m in data.get('machines', []):
+        states.setdefault(m.get('initial_state', 'clean'), len(states))
+    for r in data.get('routings', []):
+        for op in r.get('operations', []) or []:
+            states.setdefault(op.get('setup_state_key', 'clean'), len(states))
+    for mat in setup_mats.values():
+        for prev, row in (mat.get('matrix', {}) or {}).items():
+            states.setdefault(prev, len(states))
+            for nxt in row:
+                states.setdefault(nxt, len(states))
+    arrs: Dict[str, np.ndarray] = {}
+    for mat_id, mat in setup_mats.items():
+        arr = np.full((len(states), len(states)), np.nan)
+        for prev, row in (mat.get('matrix', {}) or {}).items():
+            for nxt, v in row.items():
+                arr[states[prev], states[nxt]] = float(v)
+        arrs[mat_id] = arr
+    return states, arrs
+
+def index_speed_overrides(speed_overrides: List[Dict[str, Any]]):
+    # (machine, product, op_name) / (machine, op_name) -> multiplier รวม (key ซ้ำคูณกัน)
+    so3: Dict[Tuple[str, str, str], float] = {}
+    so2: Dict[Tuple[str, str], float] = {}
+    for so in speed_overrides:
+        key = so.get('key', [])
+        mult = so.get('multiplier', 1.0) or 1.0
+        if len(key) == 3:
+            so3[tuple(key)] = so3.get(tuple(key), 1.0) * mult
+        elif len(key) == 2:
+            so2[tuple(key)] = so2.get(tuple(key), 1.0) * mult
+    return so3, so2
+
 def collect_speed_overrides(d: Dict[str, Any]) -> List[Dict[str, Any]]:
     res = []
     if 'speed_overrides' in d and isinstance(d['speed_overrides'], list):
@@ -88,45 +158,142 @@ class Context:
     data: Dict[str, Any]
     setup_mats: Dict[str, Any]
     speed_overrides: List[Dict[str, Any]]
+    so3: Dict[Tuple[str, str, str], float]
+    so2: Dict[Tuple[str, str], float]
+    state_idx: Dict[Any, int]
+    setup_arrs: Dict[str, np.ndarray]
     idx_products: Dict[str, Any]
     idx_routings: Dict[str, Any]
     idx_wc: Dict[str, Any]
     idx_machines_by_id: Dict[str, Any]
     idx_machines_by_wc: Dict[str, List[Dict[str, Any]]]
     settings: Dict[str, Any]
+    due_by_order: Dict[str, dt.datetime]
+    objective_weights: Dict[str, Any]
+    # intern id เป็น index สำหรับ schedule array (SCHED_DTYPE)
+    order_ids: List[str]
+    order_index: Dict[str, int]
+    due_min_per_order: np.ndarray      # due ของ order_ids[i] เป็นนาทีนับจาก EPOCH
+    machine_ids: List[str]
+    machine_index: Dict[str, int]
+    # cache ต่อ product_id (ข้อมูล product/routing ไม่เปลี่ยนระหว่างรัน) — frozen แต่ dict ข้างในเติมได้
+    _routing_cache: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict, repr=False, compare=False)
+    _has_painting_cache: Dict[str, bool] = field(default_factory=dict, repr=False, compare=False)  # key = routing_id
+    _routing_ops_cache: Dict[str, List["OpRec"]] = field(default_factory=dict, repr=False, compare=False)
+    # (วันที่ของ anchor, days) -> windows ต่อเครื่องแบบ list (WindowLists); ปฏิทินไม่ขึ้นกับ chromosome
+    _windows_cache: Dict[Tuple[dt.date, int], Dict[str, Any]] = field(default_factory=dict, repr=False, compare=False)
 
     @staticmethod
     def from_data(data: Dict[str, Any]) -> "Context":
         setup_mats = index_setup_mats(data.get('setup_matrices', []))
         speed_overrides = collect_speed_overrides(data)
+        so3, so2 = index_speed_overrides(speed_overrides)
+        state_idx, setup_arrs = index_setup_states(data, setup_mats)
         idx_products_ = index_products(data.get('products', []))
         idx_routings_ = index_routings(data.get('routings', []))
         idx_wc_ = index_work_centers(data.get('work_centers', []))
         m_by_id, m_by_wc = index_machines(data.get('machines', []))
+        settings = data.get('settings', {}) or {}
+        order_ids = list(dict.fromkeys(o['order_id'] for o in (data.get('orders', []) or [])))
+        due_by_order = {o['order_id']: parse_datetime(o['due_date']) for o in (data.get('orders', []) or [])}
+        machine_ids = list(m_by_id.keys())
         return Context(
             data=data,
             setup_mats=setup_mats,
             speed_overrides=speed_overrides,
+            so3=so3,
+            so2=so2,
+            state_idx=state_idx,
+            setup_arrs=setup_arrs,
             idx_products=idx_products_,
             idx_routings=idx_routings_,
             idx_wc=idx_wc_,
             idx_machines_by_id=m_by_id,
             idx_machines_by_wc=m_by_wc,
-            settings=data.get('settings', {}) or {}
+            settings=settings,
+            due_by_order=due_by_order,
+            objective_weights=settings.get('objective_weights', {}),
+            order_ids=order_ids,
+            order_index={oid: i for i, oid in enumerate(order_ids)},
+            due_min_per_order=np.array([_to_epoch_minf(due_by_order[oid]) for oid in order_ids], dtype=np.float64),
+            machine_ids=machine_ids,
+            machine_index={mid: i for i, mid in enumerate(machine_ids)}
         )
 
+@dataclass(slots=True, frozen=True)
+class OpRec:
+    """operation ของ routing ที่แปลงจาก dict ครั้งเดียว ให้ loop ของ scheduler อ่าน field ตรง ๆ"""
+    wc_id: Optional[str]
+    name: Optional[str]
+    is_painting: bool                  # name == 'painting' (ไม่สนตัวพิมพ์)
+    preemptable: bool
+    preempt_ovh_min: float
+    setup_state_key: Any
+    state_idx: int                     # setup_state_key ที่ intern แล้ว (ctx.state_idx)
+    setup_matrix_id: Optional[str]
+    setup_min_fixed: Optional[float]   # None = ไม่มี setup_time_fixed(_min) → ไปใช้ default ของเครื่อง/wc
+    proc_per_unit_min: float
+    batchable: bool
+    batch_min: Any
+    batch_max: Any
+    # machine_id -> (setup array หรือ None, ค่า fallback) ดู _setup_dispatch; เติมตอนใช้งาน
+    setup_by_machine: Dict[Any, Tuple[Optional[np.ndarray], float]] = field(default_factory=dict, repr=False, compare=False)
+
+def _op_record(op: Dict[str, Any], state_idx: Dict[Any, int]) -> OpRec:
+    if 'setup_time_fixed_min' in op:
+        setup_fixed: Optional[float] = float(op['setup_time_fixed_min'])
+    elif 'setup_time_fixed' in op:
+        setup_fixed = float(op['setup_time_fixed']) * 60.0
+    else:
+        setup_fixed = None
+    if 'proc_time_per_unit_min' in op:
+        per_unit_min = float(op['proc_time_per_unit_min'])
+    elif 'proc_time_per_unit' in op:
+        per_unit_min = float(op['proc_time_per_unit']) * 60.0
+    else:
+        per_unit_min = 0.0
+    b = op.get('batch', {}) or {}
+    return OpRec(
+        wc_id=op.get('work_center_id'),
+        name=op.get('name'),
+        is_painting=(op.get('name') or '').lower() == 'painting',
+        preemptable=bool(op.get('preemptable', False)),
+        preempt_ovh_min=float(op.get('preemption_overhead_min', 0.0) or 0.0),
+        setup_state_key=op.get('setup_state_key', 'clean'),
+        state_idx=state_idx.get(op.get('setup_state_key', 'clean'), -1),
+        setup_matrix_id=op.get('setup_matrix_id'),
+        setup_min_fixed=setup_fixed,
+        proc_per_unit_min=per_unit_min,
+        batchable=bool(op.get('batchable')),
+        batch_min=b.get('min_batch_qty'),
+        batch_max=b.get('max_batch_qty'),
+    )
+
+def routing_ops(ctx: Context, routing: Dict[str, Any]) -> List[OpRec]:
+    rid = routing.get('routing_id')
+    ops = ctx._routing_ops_cache.get(rid)
+    if ops is None:
+        ops = [_op_record(op, ctx.state_idx) for op in (routing.get('operations', []) or [])]
+        ctx._routing_ops_cache[rid] = ops
+    return ops
+
 # ============================= Helpers: Product routing candidates =============================
 
 def product_routing_candidates(ctx: Context, product_id: str) -> List[Dict[str, Any]]:
+    # list ที่คืนไปถูกแชร์จาก cache — ห้ามแก้ไข
+    cached = ctx._routing_cache.get(product_id)
+    if cached is not None:
+        return cached
     p = ctx.idx_products.get(product_id)
-    if not p:
-        return []
     rids: List[str] = []
-    if 'routing_ids' in p and isinstance(p['routing_ids'], list) and p['routing_ids']:
-        rids = [rid for rid in p['routing_ids'] if rid in ctx.idx_routings]
-    elif 'routing_id' in p and p['routing_id'] in ctx.idx_routings:
-        rids = [p['routing_id']]
-    return [ctx.idx_routings[rid] for rid in rids]
+    if p:
+        if 'routing_ids' in p and isinstance(p['routing_ids'], list) and p['routing_ids']:
+            rids = [rid for rid in p['routing_ids'] if rid in ctx.idx_routings]
+        elif 'routing_id' in p and p['routing_id'] in ctx.idx_routings:
+            rids = [p['routing_id']]
+    cands = [ctx.idx_routings[rid] for rid in rids]
+    ctx._routing_cache[product_id] = cands
+    return cands
 
 # ============================= Batch builder =============================
 
@@ -138,21 +305,25 @@ def _derive_batch_rule_for_product(ctx: Context, product_id: str, qty_total: int
         return (ls, max(ls, ls * 5))
     cands = product_routing_candidates(ctx, product_id)
     if cands:
-        for op in cands[0].get('operations', []):
-            if op.get('batchable'):
-                b = op.get('batch', {}) or {}
-                mn = int(b.get('min_batch_qty', qty_total))
-                mx = int(b.get('max_batch_qty', qty_total))
+        for op in routing_ops(ctx, cands[0]):
+            if op.batchable:
+                mn = int(qty_total if op.batch_min is None else op.batch_min)
+                mx = int(qty_total if op.batch_max is None else op.batch_max)
                 mx = max(1, mx)
                 return (mn, mx)
     return (qty_total, qty_total)
 
 def _has_painting(ctx: Context, product_id: str) -> bool:
+    # ดูเฉพาะ routing แรกของ product; flag ต่อ routing คำนวณครั้งเดียวจาก OpRec
     cands = product_routing_candidates(ctx, product_id)
     if not cands:
         return False
-    ops = cands[0].get('operations', []) or []
-    return any((op.get('name') or '').lower() == 'painting' for op in ops)
+    rid = cands[0].get('routing_id')
+    flag = ctx._has_painting_cache.get(rid)
+    if flag is None:
+        flag = any(op.is_painting for op in routing_ops(ctx, cands[0]))
+        ctx._has_painting_cache[rid] = flag
+    return flag
 
 def build_batches(ctx: Context, orders: List[Dict[str, Any]]):
     batches = []
@@ -197,59 +368,49 @@ def build_batches(ctx: Context, orders: List[Dict[str, Any]]):
 
 # ============================= Time & Cost helpers =============================
 
-def _lookup_matrix_setup_min(ctx: Context, prev_state: str, next_state: str, machine: Dict[str, Any], op: Dict[str, Any]) -> float:
-    mat_id = machine.get('setup_matrix_id') or op.get('setup_matrix_id')
+def _setup_dispatch(ctx: Context, machine: Dict[str, Any], op: OpRec) -> Tuple[Optional[np.ndarray], float]:
+    # ทุกอย่างยกเว้น state ก่อน/หลังคงที่ต่อคู่ (เครื่อง, op) → คำนวณครั้งเดียว
+    # คืน (matrix ที่ใช้, ค่าเมื่อ matrix ไม่มีค่า: op fixed → default ของเครื่อง → default ของ wc → 0)
+    wc = ctx.idx_wc.get(op.wc_id) if op.wc_id else None
+    mat_id = machine.get('setup_matrix_id') or op.setup_matrix_id
     if not mat_id:
-        wc_id = op.get('work_center_id')
-        wc = ctx.idx_wc.get(wc_id) if wc_id else None
         mat_id = wc.get('setup_matrix_id') if wc else None
-    if mat_id and mat_id in ctx.setup_mats:
-        mat_obj = ctx.setup_mats[mat_id]
-        matrix = mat_obj.get('matrix', {})
-        if prev_state in matrix and next_state in matrix[prev_state]:
-            return float(matrix[prev_state][next_state])
-
-    if 'setup_time_fixed_min' in op:
-        return float(op['setup_time_fixed_min'])
-    if 'setup_time_fixed' in op:
-        return float(op['setup_time_fixed']) * 60.0
+    arr = ctx.setup_arrs.get(mat_id) if mat_id else None
 
+    if op.setup_min_fixed is not None:
+        return arr, op.setup_min_fixed
     if machine and 'default_setup_min' in machine:
         try:
-            return float(machine['default_setup_min'])
+            return arr, float(machine['default_setup_min'])
         except Exception:
             pass
-    wc = ctx.idx_wc.get(op.get('work_center_id')) if op.get('work_center_id') else None
     if wc and 'default_setup_min' in wc:
         try:
-            return float(wc['default_setup_min'])
+            return arr, float(wc['default_setup_min'])
         except Exception:
             pass
-    return 0.0
-
-def _get_proc_time_min(ctx: Context, op: Dict[str, Any], qty: float, *, machine_id: Optional[str]=None, product_id: Optional[str]=None, machine_eff: float=1.0) -> float:
-    if 'proc_time_per_unit_min' in op:
-        per_unit_min = float(op['proc_time_per_unit_min'])
-    elif 'proc_time_per_unit' in op:
-        per_unit_min = float(op['proc_time_per_unit']) * 60.0
-    else:
-        per_unit_min = 0.0
-
-    total_min = per_unit_min * float(qty)
-
-    for so in ctx.speed_overrides:
-        key = so.get('key', [])
-        mult = so.get('multiplier', 1.0) or 1.0
-        if not mult:
-            continue
-        if len(key) == 3:
-            mk, pk, ok = key
-            if (machine_id == mk) and (product_id == pk) and (op.get('name') == ok):
-                total_min = total_min / mult
-        elif len(key) == 2:
-            mk, ok = key
-            if (machine_id == mk) and (op.get('name') == ok):
-                total_min = total_min / mult
+    return arr, 0.0
+
+def _lookup_matrix_setup_min(ctx: Context, prev_idx: int, next_idx: int, machine: Dict[str, Any], op: OpRec) -> float:
+    # prev_idx/next_idx = state ที่ intern แล้ว (-1 = ไม่รู้จัก → ไม่ใช้ matrix)
+    mid = machine.get('machine_id')
+    disp = op.setup_by_machine.get(mid)
+    if disp is None:
+        disp = op.setup_by_machine[mid] = _setup_dispatch(ctx, machine, op)
+    arr, fallback = disp
+    if arr is not None and prev_idx >= 0 and next_idx >= 0:
+        v = arr[prev_idx, next_idx]
+        if v == v:  # ไม่ใช่ NaN
+            return float(v)
+    return fallback
+
+def _get_proc_time_min(ctx: Context, op: OpRec, qty: float, *, machine_id: Optional[str]=None, product_id: Optional[str]=None, machine_eff: float=1.0) -> float:
+    total_min = op.proc_per_unit_min * float(qty)
+
+    # speed overrides: key 3 ตัวและ 2 ตัวคูณรวมกันได้ถ้า match ทั้งคู่
+    mult = ctx.so3.get((machine_id, product_id, op.name), 1.0) * ctx.so2.get((machine_id, op.name), 1.0)
+    if mult != 1.0:
+        total_min = total_min / mult
 
     if machine_eff and machine_eff > 0:
         total_min = total_min / float(machine_eff)
@@ -259,68 +420,116 @@ def _get_proc_time_min(ctx: Context, op: Dict[str, Any], qty: float, *, machine_
 # ============================= Interval & Window utils =============================
 
 Interval = Tuple[dt.datetime, dt.datetime]
-Window = Tuple[dt.datetime, dt.datetime, str]  # 'REG' | 'OT'
+# windows ของเครื่องแบบ SoA: (starts, ends) int64 นาทีนับจาก EPOCH เรียงตาม start + is_ot (bool)
+MachineWindows = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# ---- int64 minutes (นับจาก EPOCH) สำหรับงานเซตของช่วงเวลาใน build_shift_windows ----
+# ปฏิทินเป็นหน่วยนาทีอยู่แล้ว (HH:MM); วินาทีของ OT/maintenance จะถูกปัดลงเป็นนาที
+EPOCH = dt.datetime(2000, 1, 1)
+_ONE_MIN = dt.timedelta(minutes=1)
+_EMPTY_I64 = np.empty((0, 2), dtype=np.int64)
+
+# ความคลาดของ float นาที (~0.06 ms) ที่ยอมให้ตอนเช็คว่า "พอดี window" / "ชน OT cap พอดี"
+# — ของเดิมใช้ timedelta ที่แม่นระดับ µs
+_FIT_EPS_MIN = 1e-6
+
+def _to_epoch_min(d: dt.datetime) -> int:
+    return (d - EPOCH) // _ONE_MIN
+
+def _to_epoch_minf(d: dt.datetime) -> float:
+    return (d - EPOCH) / _ONE_MIN
 
-def _merge_intervals(intervals: List[Interval]) -> List[Interval]:
+@lru_cache(maxsize=65536)
+def _from_epoch_min(m: float) -> dt.datetime:
+    # เรียกตอนสร้าง step เท่านั้น; เวลาเดิมซ้ำบ่อยระหว่าง GA จึง cache ไว้
+    return EPOCH + dt.timedelta(minutes=m)
+
+def _to_i64(intervals: List[Interval]) -> np.ndarray:
     if not intervals:
-        return []
-    intervals = sorted(intervals)
-    merged = [intervals[0]]
-    for s, e in intervals[1:]:
-        ls, le = merged[-1]
-        if s <= le:
-            merged[-1] = (ls, max(le, e))
-        else:
-            merged.append((s, e))
-    return merged
-
-def _subtract_intervals(base: List[Interval], subtracts: List[Interval]) -> List[Interval]:
-    if not base:
-        return []
-    if not subtracts:
-        return base[:]
-    subtracts = _merge_intervals(subtracts)
-    out: List[Interval] = []
-    for bs, be in base:
-        cur_segments = [(bs, be)]
-        for ss, se in subtracts:
-            next_segments: List[Interval] = []
-            for cs, ce in cur_segments:
-                if se <= cs or ss >= ce:
-                    next_segments.append((cs, ce))
-                else:
-                    if ss > cs:
-                        next_segments.append((cs, ss))
-                    if se < ce:
-                        next_segments.append((se, ce))
-            cur_segments = next_segments
-        out.extend(cur_segments)
-    return [seg for seg in out if seg[1] > seg[0]]
+        return _EMPTY_I64
+    return np.array([(_to_epoch_min(s), _to_epoch_min(e)) for s, e in intervals], dtype=np.int64)
+
+def _merge_i64(arr: np.ndarray) -> np.ndarray:
+    if not len(arr):
+        return _EMPTY_I64
+    arr = arr[np.argsort(arr[:, 0], kind="stable")]
+    reach = np.maximum.accumulate(arr[:, 1])
+    head = np.ones(len(arr), dtype=bool)
+    head[1:] = arr[1:, 0] > reach[:-1]          # ชนกันพอดีก็รวม
+    idx = np.flatnonzero(head)
+    return np.column_stack((arr[idx, 0], np.maximum.reduceat(arr[:, 1], idx)))
+
+def _subtract_intervals_i64(base: np.ndarray, subtracts: np.ndarray) -> np.ndarray:
+    """base ลบด้วย subtracts — รับ/คืน int64 array (n, 2) ของนาที"""
+    if not len(base):
+        return _EMPTY_I64
+    subs = _merge_i64(subtracts)
+    if not len(subs):
+        return base.copy()
+    bs, be = base[:, 0], base[:, 1]
+    ss, se = subs[:, 0], subs[:, 1]
+    # ช่วงลบที่ทับ base i คือ subs[j0[i]:j1[i]]
+    j0 = np.searchsorted(se, bs, side="right")
+    j1 = np.maximum(np.searchsorted(ss, be, side="left"), j0)
+    cnt = j1 - j0 + 1                             # จำนวนชิ้นต่อ base ก่อนตัดชิ้นว่าง
+    owner = np.repeat(np.arange(len(bs)), cnt)
+    k = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+    last = len(ss) - 1
+    ps = np.where(k == 0, bs[owner], se[np.clip(j0[owner] + k - 1, 0, last)])
+    pe = np.where(k == cnt[owner] - 1, be[owner], ss[np.clip(j0[owner] + k, 0, last)])
+    ps = np.maximum(ps, bs[owner]); pe = np.minimum(pe, be[owner])
+    keep = pe > ps
+    return np.column_stack((ps[keep], pe[keep]))
 
 # แทนของเดิม
-def _time_on_date(date: dt.date, hhmm: str) -> dt.datetime:
+def _hhmm_to_min(hhmm: str) -> int:
+    # นาทีนับจากเที่ยงคืนของวันนั้น; "24:00" = 1440 (เที่ยงคืนวันถัดไป)
     hh, mm = hhmm.split(":")
     hh = int(hh); mm = int(mm or 0)
     if hh == 24 and mm == 0:
-        return dt.datetime(year=date.year, month=date.month, day=date.day) + dt.timedelta(days=1)
+        return 1440
     if not (0 <= hh <= 23 and 0 <= mm <= 59):
         raise ValueError(f"Invalid time: {hhmm}")
-    return dt.datetime(year=date.year, month=date.month, day=date.day, hour=hh, minute=mm)
-
-def _split_minutes_by_day(s: dt.datetime, e: dt.datetime) -> Dict[dt.date, float]:
-    out: Dict[dt.date, float] = {}
-    cur = s
-    while cur < e:
-        end_day = (cur.replace(hour=0, minute=0, second=0, microsecond=0) + dt.timedelta(days=1))
-        seg_end = min(e, end_day)
-        out.setdefault(cur.date(), 0.0)
-        out[cur.date()] += (seg_end - cur).total_seconds() / 60.0
-        cur = seg_end
+    return hh * 60 + mm
+
+def _shift_day_mask(start_hhmm: str, end_hhmm: str, breaks: List[Dict[str, str]]) -> np.ndarray:
+    """mask รายนาทีของ shift หนึ่งวัน (ยาว 2 วันเผื่อกะข้ามคืน) หลังหัก breaks ของวันเดียวกัน"""
+    mask = np.zeros(2 * 1440, dtype=bool)
+    st = _hhmm_to_min(start_hhmm)
+    en = _hhmm_to_min(end_hhmm)
+    if en <= st:
+        en += 1440
+    mask[st:en] = True
+    for br in breaks:
+        brs = _hhmm_to_min(br['start'])
+        bre = _hhmm_to_min(br['end'])
+        if bre <= brs:
+            bre += 1440
+        mask[brs:bre] = False
+    return mask
+
+def _mask_to_i64(mask: np.ndarray, origin_min: int) -> np.ndarray:
+    # runs ของ True → ช่วง [start, end) ในหน่วยนาทีนับจาก EPOCH
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return np.column_stack((starts, ends)).astype(np.int64) + origin_min
+
+def _split_minutes_by_day(s_min: float, e_min: float, out: Optional[Dict[int, float]] = None) -> Dict[int, float]:
+    # แตกช่วง [s_min, e_min) (นาทีนับจาก EPOCH) เป็นนาทีต่อวัน; key = index วันนับจาก EPOCH
+    if out is None:
+        out = {}
+    cur = s_min
+    while cur < e_min:
+        day = int(cur // 1440)
+        nxt = min((day + 1) * 1440, e_min)
+        out[day] = out.get(day, 0.0) + (nxt - cur)
+        cur = nxt
     return out
 
 # ============================= Windows (shifts/holidays/maintenance + OT) =============================
 
-def build_shift_windows(ctx: Context, start_anchor: dt.datetime, days: int = 14) -> Dict[str, List[Window]]:
+def build_shift_windows(ctx: Context, start_anchor: dt.datetime, days: int = 14) -> Dict[str, MachineWindows]:
     data = ctx.data or {}
     cal = (data.get('calendar') or {})
 
@@ -356,60 +565,41 @@ def build_shift_windows(ctx: Context, start_anchor: dt.datetime, days: int = 14)
     shift_by = {s['shift_id']: s for s in raw_shifts}
 
     # 2) คำนวณช่วง REG ต่อ shift และหัก breaks (shift + global)
-    reg_by_shift: Dict[str, List[Interval]] = {}
+    #    ทุกวันมีรูปแบบเดียวกัน → หาช่วงของวันเดียวจาก mask แล้วเลื่อนทีละ 1440 นาทีให้ครบทุกวันในครั้งเดียว
+    #    (break ของวัน d ตัดเฉพาะกะของวัน d เหมือนเดิม)
+    anchor_min = _to_epoch_min(dt.datetime.combine(start_anchor.date(), dt.time()))
+    days_off = np.arange(days, dtype=np.int64) * 1440
+    reg_by_shift: Dict[str, np.ndarray] = {}
     for sid, s in shift_by.items():
-        windows: List[Interval] = []
         shift_breaks = _normalize_breaks(s.get('breaks')) + global_breaks
-
-        for d in range(days):
-            base = (start_anchor.date() + dt.timedelta(days=d))
-            st = _time_on_date(base, s['start_time'])
-            en = _time_on_date(base, s['end_time'])
-            if en <= st:
-                en = en + dt.timedelta(days=1)
-
-            day_windows = [(st, en)]
-
-            # subtract ทุก break ของวันนั้น
-            for br in (shift_breaks or []):
-                brs = _time_on_date(base, br['start'])
-                bre = _time_on_date(base, br['end'])
-                if bre <= brs:
-                    bre = bre + dt.timedelta(days=1)
-                day_windows = _subtract_intervals(day_windows, [(brs, bre)])
-
-            windows.extend(day_windows)
-
-        reg_by_shift[sid] = _merge_intervals(windows)
+        day_runs = _mask_to_i64(_shift_day_mask(s['start_time'], s['end_time'], shift_breaks), anchor_min)
+        reg_by_shift[sid] = _merge_i64((day_runs[None, :, :] + days_off[:, None, None]).reshape(-1, 2))
 
     # 3) holidays (จาก calendar.holidays)
     holis = []
     for h in (cal.get('holidays') or []):
-        try:
-            d = dt.datetime.strptime(h, "%Y-%m-%d").date()
-        except Exception:
-            d = parse_datetime(h).date()
+        d = parse_datetime(h).date()
         holis.append(
             (dt.datetime(d.year, d.month, d.day),
              dt.datetime(d.year, d.month, d.day) + dt.timedelta(days=1))
         )
+    holis_i64 = _to_i64(holis)
 
     # 4) map windows ต่อเครื่อง (รวมหลาย shift ของเครื่องเดียวกัน)
     machines_by_id = ctx.idx_machines_by_id
-    reg_by_machine: Dict[str, List[Interval]] = {}
+    reg_by_machine: Dict[str, np.ndarray] = {}
     for mid, m in machines_by_id.items():
         shift_ids = m.get('shifts', [])
-        merged: List[Interval] = []
-        for sid in shift_ids:
-            merged.extend(reg_by_shift.get(sid, []))
+        parts = [reg_by_shift[sid] for sid in shift_ids if sid in reg_by_shift]
+        merged = np.concatenate(parts) if parts else _EMPTY_I64
 
         # ถ้าเครื่องไม่มี shift ให้ default เป็นทั้งช่วงวัน
-        if not merged:
+        if not len(merged):
             start = start_anchor.replace(hour=0, minute=0, second=0, microsecond=0)
-            merged = [(start, start + dt.timedelta(days=days))]
+            merged = _to_i64([(start, start + dt.timedelta(days=days))])
 
-        merged = _merge_intervals(merged)
-        merged = _subtract_intervals(merged, holis)
+        merged = _merge_i64(merged)
+        merged = _subtract_intervals_i64(merged, holis_i64)
 
         # 5) maintenance ต่อเครื่อง
         maints: List[Interval] = []
@@ -419,7 +609,7 @@ def build_shift_windows(ctx: Context, start_anchor: dt.datetime, days: int = 14)
                 me = parse_datetime(mm['end'])
                 if me > ms:
                     maints.append((ms, me))
-        merged = _subtract_intervals(merged, maints)
+        merged = _subtract_intervals_i64(merged, _to_i64(maints))
         reg_by_machine[mid] = merged
 
     # 6) OT windows (global) ลบช่วง REG ออกให้เหลือเฉพาะส่วนที่เป็น OT
@@ -432,121 +622,143 @@ def build_shift_windows(ctx: Context, start_anchor: dt.datetime, days: int = 14)
             continue
         if e > s:
             raw_ots.append((s, e))
-    raw_ots = _merge_intervals(raw_ots)
+    raw_ots_i64 = _merge_i64(_to_i64(raw_ots))
 
-    windows_by_machine: Dict[str, List[Window]] = {}
+    windows_by_machine: Dict[str, MachineWindows] = {}
     for mid in machines_by_id.keys():
-        reg = reg_by_machine.get(mid, [])
-        ot_minus_reg: List[Interval] = []
-        for (os_, oe_) in raw_ots:
-            segs = _subtract_intervals([(os_, oe_)], reg)
-            ot_minus_reg.extend(segs)
-        ot_minus_reg = _merge_intervals(ot_minus_reg)
-
-        windows: List[Window] = []
-        for s_, e_ in reg:
-            windows.append((s_, e_, "REG"))
-        for s_, e_ in ot_minus_reg:
-            windows.append((s_, e_, "OT"))
-        windows.sort(key=lambda x: x[0])
-        windows_by_machine[mid] = windows
+        reg = reg_by_machine[mid]
+        ot_minus_reg = _merge_i64(_subtract_intervals_i64(raw_ots_i64, reg))
+
+        starts = np.concatenate((reg[:, 0], ot_minus_reg[:, 0]))
+        ends = np.concatenate((reg[:, 1], ot_minus_reg[:, 1]))
+        is_ot = np.concatenate((np.zeros(len(reg), dtype=bool), np.ones(len(ot_minus_reg), dtype=bool)))
+        order = np.argsort(starts, kind="stable")
+        windows_by_machine[mid] = (starts[order], ends[order], is_ot[order])
 
     return windows_by_machine
 
 # ============================= Packing helpers =============================
 
-def _find_slot_contiguous(windows: List[Window], earliest: dt.datetime, need_min: float) -> Optional[Tuple[dt.datetime, dt.datetime]]:
-    need = dt.timedelta(minutes=float(need_min))
-    for ws, we, _kind in windows:
-        s = max(ws, earliest)
-        if we - s >= need:
-            return (s, s + need)
-    return None
-
-def _pack_across_windows(windows: List[Window], earliest: dt.datetime, need_min: float, *,
-                         setup_min: float = 0.0,
-                         preemption_overhead_min: float = 0.0) -> Optional[Tuple[dt.datetime, dt.datetime, float, int, Dict[dt.date, float]]]:
-    remaining = dt.timedelta(minutes=float(need_min))
-    setup_td  = dt.timedelta(minutes=float(setup_min))
-    ovh_td    = dt.timedelta(minutes=float(preemption_overhead_min))
-
-    started: Optional[dt.datetime] = None
+# windows ของเครื่องแบบ list ของ Python (starts, ends, is_ot) สำหรับ loop ใน scheduler
+# — ใช้ bisect กับ scalar ได้เร็วกว่าเรียก numpy ทีละครั้ง
+WindowLists = Tuple[List[int], List[int], List[bool]]
+_NO_WINDOW_LISTS: WindowLists = ([], [], [])
+
+def _window_lists(windows: MachineWindows) -> WindowLists:
+    starts, ends, is_ot = windows
+    return (starts.tolist(), ends.tolist(), is_ot.tolist())
+
+def _first_open_window(windows: WindowLists, earliest: float) -> int:
+    # index ของ window แรกที่ end > earliest (window ก่อนหน้านั้นหมดเวลาแล้ว)
+    return bisect_right(windows[1], earliest)
+
+def _find_slot_contiguous(windows: WindowLists, earliest: float, need_min: float,
+                          first: int) -> Tuple[int, float]:
+    """first-fit แบบต่อเนื่อง เริ่มดูจาก window first (= _first_open_window)
+       คืน (index ของ window ที่วางได้ หรือ -1, start นาที)
+    """
+    starts, ends, _is_ot = windows
+    need = need_min - _FIT_EPS_MIN
+    for k in range(first, len(ends)):
+        s = starts[k]
+        if s < earliest:
+            s = earliest
+        if ends[k] - s >= need:
+            return k, s
+    return -1, 0.0
+
+def _pack_across_windows(win_starts: List[int], win_ends: List[int], win_is_ot: List[bool],
+                         earliest: float, need_min: float, setup_min: float,
+                         ovh_min: float, first: int = 0) -> Optional[Tuple[float, float, float, int, Dict[int, float]]]:
+    """วางงานแบบแบ่งข้าม windows บนนาที float (นับจาก EPOCH) ล้วน ๆ ไม่มี datetime/timedelta
+       เริ่มดูจาก window first; คืน (start, finish, ovh_min, splits, {day_index: OT นาที}) หรือ None ถ้าวางไม่ครบ
+    """
+    remaining = need_min
+    setup_left = setup_min
+    started: Optional[float] = None
     cur_time = earliest
-    total_ovh = dt.timedelta(0)
+    total_ovh = 0.0
     num_splits = 0
-    ot_minutes_by_day: Dict[dt.date, float] = {}
+    ot_by_day: Dict[int, float] = {}
 
-    for ws, we, kind in windows:
-        s = max(ws, cur_time)
+    for k in range(first, len(win_ends)):
+        ws = win_starts[k]
+        we = win_ends[k]
+        s = ws if ws > cur_time else cur_time
         if s >= we:
             continue
 
-        if setup_td > dt.timedelta(0):
-            if we - s >= setup_td:
+        if setup_left > 0.0:
+            if we - s >= setup_left - _FIT_EPS_MIN:
                 if started is None:
                     started = s
-                s = s + setup_td
-                remaining -= setup_td
-                setup_td = dt.timedelta(0)
+                s += setup_left
+                remaining -= setup_left
+                setup_left = 0.0
             else:
                 continue
 
-        if remaining <= dt.timedelta(0):
+        if remaining <= _FIT_EPS_MIN:
             break
 
         usable = we - s
-        if usable <= dt.timedelta(0):
+        if usable <= 0.0:
             continue
 
-        use = min(usable, remaining)
-        if kind == "OT":
-            seg_s = s
-            seg_e = s + use
-            per_day = _split_minutes_by_day(seg_s, seg_e)
-            for dkey, mins in per_day.items():
-                ot_minutes_by_day[dkey] = ot_minutes_by_day.get(dkey, 0.0) + mins
+        use = usable if usable < remaining else remaining
+        if win_is_ot[k]:
+            _split_minutes_by_day(s, s + use, ot_by_day)
 
         if started is None:
             started = s
-        s = s + use
+        s += use
         remaining -= use
 
-        if remaining > dt.timedelta(0):
-            total_ovh += ovh_td
+        if remaining > _FIT_EPS_MIN:
+            total_ovh += ovh_min
             num_splits += 1
             cur_time = we
         else:
             cur_time = s
             break
 
-    if remaining > dt.timedelta(0) or started is None:
+    if remaining > _FIT_EPS_MIN or started is None:
         return None
-    return (started, cur_time + total_ovh, total_ovh.total_seconds()/60.0, num_splits, ot_minutes_by_day)
+    return (started, cur_time + total_ovh, total_ovh, num_splits, ot_by_day)
 
 # ============================= Decode & Evaluate =============================
 
-def _auto_horizon_days(chrom: List[Dict[str, Any]]) -> int:
+_get_release = itemgetter('release_date')
+_get_due = itemgetter('due_date')
+
+def _auto_horizon_days(rel: dt.datetime, due: dt.datetime) -> int:
+    # rel = release แรกสุด, due = due ช้าสุดของ chromosome (decode คำนวณให้ครั้งเดียว)
     try:
-        rel = min(b['release_date'] for b in chrom)
-        due = max(b['due_date'] for b in chrom)
         span_days = max(1, (due - rel).days) + 3
         return max(7, min(span_days, 60))
     except Exception:
         return 14
 
-def _schedule_once(ctx: Context, chrom: List[Dict[str, Any]], base_days: int, fail_stats: Dict[str, int]):
+def _schedule_once(ctx: Context, chrom: List[Dict[str, Any]], base_days: int, fail_stats: Dict[str, int],
+                   earliest_release: dt.datetime):
     schedule: List[Dict[str, Any]] = []
+    sched_recs: List[Tuple] = []
     skipped = 0
 
     machines_by_id = ctx.idx_machines_by_id
     machines_by_wc = ctx.idx_machines_by_wc
     wc_by_id = ctx.idx_wc
 
-    earliest_release = min((b['release_date'] for b in chrom), default=dt.datetime.now())
-    windows_by_machine = build_shift_windows(ctx, earliest_release, days=base_days)
+    # build_shift_windows ใช้แค่วันที่ของ anchor → cache ตาม (date, days); ห้ามแก้ list ที่ได้กลับมา
+    win_key = (earliest_release.date(), base_days)
+    windows_by_machine = ctx._windows_cache.get(win_key)
+    if windows_by_machine is None:
+        windows_by_machine = {mid: _window_lists(w) for mid, w in build_shift_windows(ctx, earliest_release, days=base_days).items()}
+        ctx._windows_cache[win_key] = windows_by_machine
 
     # OT cap
-    ot_used: Dict[Tuple[str, dt.date], float] = {}
+    # key = (machine_id, index วันนับจาก EPOCH)
+    ot_used: Dict[Tuple[str, int], float] = {}
     cal = ctx.data.get("calendar", {}) or {}
     cap_hours = cal.get("ot_cap_hours_per_day", None)
     ot_cap_min: Optional[float] = None
@@ -557,116 +769,107 @@ def _schedule_once(ctx: Context, chrom: List[Dict[str, Any]], base_days: int, fa
             ot_cap_min = None
 
     # machine states
-    machine_free: Dict[str, dt.datetime] = {m_id: earliest_release for m_id in machines_by_id.keys()}
-    machine_state: Dict[str, str] = {m_id: machines_by_id[m_id].get('initial_state', 'clean') for m_id in machines_by_id.keys()}
+    # เวลาว่างของเครื่องเก็บเป็นนาทีจาก EPOCH
+    release_min = _to_epoch_minf(earliest_release)
+    machine_free: Dict[str, float] = {m_id: release_min for m_id in machines_by_id.keys()}
+    # state เก็บเป็น index จาก ctx.state_idx
+    machine_state: Dict[str, int] = {m_id: ctx.state_idx[machines_by_id[m_id].get('initial_state', 'clean')] for m_id in machines_by_id.keys()}
 
     prefs = ctx.data.get("preference_settings", {}) or {}
     allow_preempt = bool(prefs.get("allow_job_preemption", True))
 
+    # เครื่องใน work center (คำนวณครั้งเดียวต่อ wc ต่อรอบ)
+    wc_candidates: Dict[str, List[Dict[str, Any]]] = {}
+
     def try_schedule_with_routing(batch: Dict[str, Any], routing: Dict[str, Any]):
-        temp_free = deepcopy(machine_free)
-        temp_state = deepcopy(machine_state)
-        temp_ot_used = deepcopy(ot_used)
+        # แกนคำนวณใช้นาที (float) ล้วน — แปลงเป็น datetime เฉพาะเครื่องที่เลือกแล้วตอนสร้าง step
+        # เก็บเฉพาะส่วนที่ routing นี้เปลี่ยน (overlay ทับค่าจริง) — ค่าจริงแก้ทีเดียวตอนเลือก routing ได้แล้ว
+        free_upd: Dict[str, float] = {}
+        state_upd: Dict[str, int] = {}
+        ot_upd: Dict[Tuple[str, int], float] = {}
         steps: List[Dict[str, Any]] = []
-
-        cur_start = max(batch['release_date'], earliest_release)
-
-        for op in routing.get('operations', []) or []:
-            wc_id = op['work_center_id']
-            candidates = list(machines_by_wc.get(wc_id, []))
-            if not candidates:
-                wc = wc_by_id.get(wc_id)
-                if wc:
-                    ids = set(wc.get('parallel_machines', []))
-                    candidates = [machines_by_id[mid] for mid in ids if mid in machines_by_id]
+        step_recs: List[Tuple] = []  # แถวของ SCHED_DTYPE คู่กับ steps
+        order_idx = ctx.order_index.get(batch['order_id'], -1)
+
+        cur_start = _to_epoch_minf(max(batch['release_date'], earliest_release))
+        qty = batch['qty']
+        product_id = batch['product_id']
+
+        for op in routing_ops(ctx, routing):
+            wc_id = op.wc_id
+            candidates = wc_candidates.get(wc_id)
+            if candidates is None:
+                candidates = list(machines_by_wc.get(wc_id, []))
+                if not candidates:
+                    wc = wc_by_id.get(wc_id)
+                    if wc:
+                        ids = set(wc.get('parallel_machines', []))
+                        candidates = [machines_by_id[mid] for mid in ids if mid in machines_by_id]
+                wc_candidates[wc_id] = candidates
             if not candidates:
                 fail_stats['no_machine_in_wc'] += 1
                 return None  # infeasible
 
-            best: Optional[Dict[str, Any]] = None
+            # best = (finish, start, index เครื่อง, setup, proc, splits, ot_usage)
+            best: Optional[Tuple[float, float, int, float, float, int, Dict[int, float]]] = None
             saw_no_window = True
             saw_ot_cap = False
             saw_no_contig = False
             saw_pack_fail = False
 
-            for mc in candidates:
-                mid = mc['machine_id']
-                est = max(cur_start, temp_free[mid])
+            next_state = op.state_idx
+            is_preemptable = op.preemptable and allow_preempt
+            preempt_ovh    = op.preempt_ovh_min
 
-                prev_state = temp_state.get(mid, mc.get('initial_state', 'clean'))
-                next_state = op.get('setup_state_key', 'clean')
+            for i, mc in enumerate(candidates):
+                mid = mc['machine_id']
+                free = free_upd[mid] if mid in free_upd else machine_free[mid]
+                est_min = cur_start if cur_start >= free else free
+                prev_state = state_upd[mid] if mid in state_upd else machine_state[mid]
                 setup_min  = _lookup_matrix_setup_min(ctx, prev_state, next_state, mc, op)
                 machine_eff = float(mc.get('efficiency', 1.0) or 1.0)
-                proc_min   = _get_proc_time_min(ctx, op, batch['qty'], machine_id=mid, product_id=batch['product_id'], machine_eff=machine_eff)
-                need_min   = setup_min + proc_min
-
-                wins = windows_by_machine.get(mid, [])
-                wins_to_search: List[Window] = [(max(est, a), b, k) for (a, b, k) in wins if b > est]
-                if wins_to_search:
+                proc_min   = _get_proc_time_min(ctx, op, qty, machine_id=mid, product_id=product_id, machine_eff=machine_eff)
+                need_min = setup_min + proc_min
+                ot_minutes_by_day: Dict[int, float] = {}
+
+                # ข้าม window ที่หมดก่อน est ด้วย bisect
+                wins = windows_by_machine.get(mid, _NO_WINDOW_LISTS)
+                first = _first_open_window(wins, est_min)
+                if first < len(wins[1]):
                     saw_no_window = False
 
-                is_preemptable = bool(op.get('preemptable', False)) and allow_preempt
-                preempt_ovh    = float(op.get('preemption_overhead_min', 0.0) or 0.0)
-
-                cand: Optional[Dict[str, Any]] = None
-                ot_minutes_by_day: Dict[dt.date, float] = {}
-
                 if not is_preemptable:
-                    cont = _find_slot_contiguous(wins_to_search, est, need_min)
-                    if cont:
-                        st, fn = cont
-                        ot_ok = True
-                        for ws, we, kind in wins_to_search:
-                            if kind != "OT":
-                                continue
-                            seg_s = max(ws, st)
-                            seg_e = min(we, fn)
-                            if seg_e > seg_s:
-                                per_day = _split_minutes_by_day(seg_s, seg_e)
-                                for dkey, mins in per_day.items():
-                                    ot_minutes_by_day[dkey] = ot_minutes_by_day.get(dkey, 0.0) + mins
-                        if ot_cap_min is not None:
-                            for dkey, mins in ot_minutes_by_day.items():
-                                used = temp_ot_used.get((mid, dkey), 0.0)
-                                if used + mins > ot_cap_min + 1e-9:
-                                    ot_ok = False
-                                    saw_ot_cap = True
-                                    break
-                        if ot_ok:
-                            cand = {
-                                'machine': mid, 'start': st, 'finish': fn,
-                                'setup_min': setup_min, 'proc_min': proc_min, 'splits': 0,
-                                'ot_usage': ot_minutes_by_day
-                            }
-                    else:
+                    k, st_min = _find_slot_contiguous(wins, est_min, need_min, first)
+                    if k < 0:
                         saw_no_contig = True
+                        continue
+                    fn_min = st_min + need_min
+                    splits = 0
+                    # งานต่อเนื่องอยู่ใน window เดียว → นับ OT เฉพาะเมื่อ window นั้นเป็น OT
+                    if wins[2][k]:
+                        ot_minutes_by_day = _split_minutes_by_day(st_min, fn_min)
                 else:
-                    packed = _pack_across_windows(
-                        wins_to_search, est, need_min,
-                        setup_min=setup_min,
-                        preemption_overhead_min=preempt_ovh
-                    )
-                    if packed:
-                        st, fn, ovh_min, splits, ot_minutes_by_day = packed
-                        ot_ok = True
-                        if ot_cap_min is not None:
-                            for dkey, mins in ot_minutes_by_day.items():
-                                used = temp_ot_used.get((mid, dkey), 0.0)
-                                if used + mins > ot_cap_min + 1e-9:
-                                    ot_ok = False
-                                    saw_ot_cap = True
-                                    break
-                        if ot_ok:
-                            cand = {
-                                'machine': mid, 'start': st, 'finish': fn,
-                                'setup_min': setup_min, 'proc_min': proc_min + ovh_min,
-                                'splits': int(splits), 'ot_usage': ot_minutes_by_day
-                            }
-                    else:
+                    packed = _pack_across_windows(*wins, est_min, need_min, setup_min, preempt_ovh, first)
+                    if not packed:
                         saw_pack_fail = True
-
-                if cand is not None and ((best is None) or (cand['finish'] < best['finish'])):
-                    best = cand
+                        continue
+                    st_min, fn_min, ovh_min, splits, ot_minutes_by_day = packed
+                    proc_min += ovh_min
+
+                # finish ต่างกันไม่เกิน eps ถือว่าเท่ากัน → เก็บเครื่องแรกไว้
+                if best is not None and not (fn_min < best[0] - _FIT_EPS_MIN):
+                    continue
+                ot_ok = True
+                if ot_cap_min is not None:
+                    for dkey, mins in ot_minutes_by_day.items():
+                        key = (mid, dkey)
+                        used = ot_upd[key] if key in ot_upd else ot_used.get(key, 0.0)
+                        if used + mins > ot_cap_min + _FIT_EPS_MIN:
+                            ot_ok = False
+                            saw_ot_cap = True
+                            break
+                if ot_ok:
+                    best = (fn_min, st_min, i, setup_min, proc_min, int(splits), ot_minutes_by_day)
 
             if best is None:
                 if saw_no_window:
@@ -681,33 +884,37 @@ def _schedule_once(ctx: Context, chrom: List[Dict[str, Any]], base_days: int, fa
                     fail_stats['unknown_fit_fail'] += 1
                 return None  # infeasible for this routing
 
+            fn_min, st_min, i, setup_min, proc_min, splits, ot_usage = best
+            best_mid = candidates[i]['machine_id']
             steps.append({
                 'batch_id': batch.get('batch_id', ''),
                 'order_id': batch['order_id'],
-                'product_id': batch['product_id'],
+                'product_id': product_id,
                 'routing_id': routing['routing_id'],
-                'operation': op['name'],
-                'qty': batch['qty'],
-                'machine': best['machine'],
-                'start': best['start'],
-                'finish': best['finish'],
-                'setup_min': best['setup_min'],
-                'proc_min': best['proc_min'],
-                'splits': best.get('splits', 0)
+                'operation': op.name,
+                'qty': qty,
+                'machine': best_mid,
+                'start': _from_epoch_min(st_min),
+                'finish': _from_epoch_min(fn_min),
+                'setup_min': setup_min,
+                'proc_min': proc_min,
+                'splits': splits
             })
-            for dkey, mins in (best.get('ot_usage') or {}).items():
-                temp_ot_used[(best['machine'], dkey)] = temp_ot_used.get((best['machine'], dkey), 0.0) + mins
-            temp_free[best['machine']] = best['finish']
-            temp_state[best['machine']] = op.get('setup_state_key', 'clean')
-            cur_start = best['finish']
+            step_recs.append((order_idx, ctx.machine_index.get(best_mid, -1), st_min, fn_min, setup_min, proc_min, splits))
+            for dkey, mins in ot_usage.items():
+                key = (best_mid, dkey)
+                ot_upd[key] = (ot_upd[key] if key in ot_upd else ot_used.get(key, 0.0)) + mins
+            free_upd[best_mid] = fn_min
+            state_upd[best_mid] = op.state_idx
+            cur_start = fn_min
 
-        final_finish = steps[-1]['finish'] if steps else cur_start
         return {
             "steps": steps,
-            "finish": final_finish,
-            "temp_free": temp_free,
-            "temp_state": temp_state,
-            "temp_ot_used": temp_ot_used
+            "step_recs": step_recs,
+            "finish": cur_start,  # นาทีจาก EPOCH
+            "free_upd": free_upd,
+            "state_upd": state_upd,
+            "ot_upd": ot_upd
         }
 
     for batch in chrom:
@@ -722,7 +929,7 @@ def _schedule_once(ctx: Context, chrom: List[Dict[str, Any]], base_days: int, fa
             plan = try_schedule_with_routing(batch, routing)
             if plan is None:
                 continue
-            if (best_plan is None) or (plan["finish"] < best_plan["finish"]):
+            if (best_plan is None) or (plan["finish"] < best_plan["finish"] - _FIT_EPS_MIN):
                 best_plan = plan
 
         if best_plan is None:
@@ -730,11 +937,33 @@ def _schedule_once(ctx: Context, chrom: List[Dict[str, Any]], base_days: int, fa
             continue
 
         schedule.extend(best_plan["steps"])
-        machine_free = best_plan["temp_free"]
-        machine_state = best_plan["temp_state"]
-        ot_used = best_plan["temp_ot_used"]
-
-    return {'schedule': schedule, 'skipped': skipped}
+        sched_recs.extend(best_plan["step_recs"])
+        machine_free.update(best_plan["free_upd"])
+        machine_state.update(best_plan["state_upd"])
+        ot_used.update(best_plan["ot_upd"])
+
+    return {'schedule': schedule, 'skipped': skipped, 'sched_arr': np.array(sched_recs, dtype=SCHED_DTYPE)}
+
+# schedule แบบ SoA คู่กับ list ของ dict (decoded['sched_arr']); เวลาเป็นนาที float นับจาก EPOCH
+# order_idx/machine_idx = index ใน ctx.order_ids/ctx.machine_ids (-1 = ไม่รู้จัก)
+SCHED_DTYPE = np.dtype([
+    ('order_idx', 'i4'), ('machine_idx', 'i4'),
+    ('start_min', 'f8'), ('finish_min', 'f8'),
+    ('setup_min', 'f8'), ('proc_min', 'f8'),
+    ('splits', 'i4'),
+])
+
+def _schedule_arrays(ctx: Context, schedule: List[Dict[str, Any]]) -> np.ndarray:
+    # สำหรับ schedule ที่ไม่ได้มาจาก decode (ไม่มี sched_arr)
+    return np.array([
+        (ctx.order_index.get(s['order_id'], -1), ctx.machine_index.get(s['machine'], -1),
+         _to_epoch_minf(s['start']), _to_epoch_minf(s['finish']),
+         s.get('setup_min', 0.0), s.get('proc_min', 0.0), int(s.get('splits', 0)))
+        for s in schedule
+    ], dtype=SCHED_DTYPE)
+
+# เหตุที่ไม่ขึ้นกับ horizon (ดู fail_stats ใน _schedule_once)
+_STRUCTURAL_FAILS = frozenset(('no_routing_for_product', 'no_machine_in_wc'))
 
 def decode(ctx: Context, chrom: List[Dict[str, Any]]):
     # ✅ กันตกชั้นที่ 1: กรอง None / ชนิดที่ไม่ใช่ dict
@@ -754,8 +983,10 @@ def decode(ctx: Context, chrom: List[Dict[str, Any]]):
     if not chrom:
         return {'schedule': [], 'skipped': skipped_pre, 'fail_stats': {}}
 
-    # horizon พื้นฐาน + fallback ขยายอัตโนมัติ
-    base_days = _auto_horizon_days(chrom)
+    # horizon พื้นฐาน + fallback ขยายอัตโนมัติ (release แรก/due สุดท้าย คำนวณครั้งเดียว)
+    rel_min = min(map(_get_release, chrom))
+    due_max = max(map(_get_due, chrom))
+    base_days = _auto_horizon_days(rel_min, due_max)
 
     best_decoded = None
     best_tuple = None  # (skipped, makespan)
@@ -764,14 +995,12 @@ def decode(ctx: Context, chrom: List[Dict[str, Any]]):
 
     for add_days in (0, 7, 14):  # ✅ ลองขยายกรอบเวลา 0 / +7 / +14 วัน
         fail_stats = defaultdict(int)
-        decoded = _schedule_once(ctx, chrom, base_days + add_days, fail_stats)
+        decoded = _schedule_once(ctx, chrom, base_days + add_days, fail_stats, rel_min)
 
         # ranking: น้อย skipped กว่า → ดีกว่า, ถ้าเท่ากัน เปรียบ makespan
         skipped = decoded['skipped']
-        if decoded['schedule']:
-            makespan = max(s['finish'] for s in decoded['schedule'])
-        else:
-            makespan = dt.datetime.max
+        fin = decoded['sched_arr']['finish_min']
+        makespan = float(fin.max()) if len(fin) else math.inf
 
         rank = (skipped, makespan)
         if (best_tuple is None) or (rank < best_tuple):
@@ -783,6 +1012,9 @@ def decode(ctx: Context, chrom: List[Dict[str, Any]]):
         # ถ้าจัดครบแล้ว ไม่ต้องลองเพิ่มวัน
         if skipped == 0:
             break
+        # วางไม่ได้เพราะโครงสร้างข้อมูลล้วน ๆ (ไม่มี routing / ไม่มีเครื่อง) → ขยายวันไปก็ได้ผลเดิม
+        if all(k in _STRUCTURAL_FAILS for k, v in fail_stats.items() if v):
+            break
 
     # รวม skipped จากการกรองช่วงต้นด้วย
     out = best_decoded or {'schedule': [], 'skipped': 0}
@@ -790,170 +1022,291 @@ def decode(ctx: Context, chrom: List[Dict[str, Any]]):
     out['fail_stats'] = dict(fail_stats_all)
     return out
 
-def evaluate(ctx: Context, decoded: Dict[str, Any]) -> float:
+def evaluate(ctx: Context, decoded: Dict[str, Any], cutoff: Optional[float] = None) -> float:
+    # cutoff: ทุกเทอมไม่ติดลบ (weight >= 0) → พอผลรวมบางส่วนเกิน cutoff ก็คืนทันที
+    #         ค่าที่คืนตอนตัดเป็นแค่ขอบล่าง ใช้ตัดสินว่า "ไม่ดีกว่า cutoff" เท่านั้น
     schedule = decoded['schedule']
     skipped = decoded.get('skipped', 0)
 
     if not schedule:
         return 1e12 + 1e9 * skipped
 
-    makespan = max(s['finish'] for s in schedule)
-    start0 = min(s['start'] for s in schedule)
-
-    last_finish_by_order: Dict[str, dt.datetime] = {}
-    for s in schedule:
-        last_finish_by_order[s['order_id']] = max(
-            last_finish_by_order.get(s['order_id'], s['finish']), s['finish']
-        )
-
-    tardiness_min = 0.0
-    all_orders = list(ctx.data.get('orders', []))
-    due_by_order = {o['order_id']: parse_datetime(o['due_date']) for o in all_orders}
-    for oid, fin in last_finish_by_order.items():
-        due = due_by_order.get(oid)
-        if not due:
-            continue
-        delay = max((fin - due).total_seconds() / 60.0, 0.0)
-        tardiness_min += delay
-
-    w = (ctx.settings or {}).get('objective_weights', {})
+    w = ctx.objective_weights
+    w_make = w.get('makespan', 1.0)
+    w_tard = w.get('tardiness', 10.0)
+    w_setup = w.get('setup_cost', 5.0)
+    w_pre = w.get('preemption_cost', 0.0)
+    if cutoff is not None and min(w_make, w_tard, w_setup, w_pre) < 0:
+        cutoff = None
+    skip_term = 1e6 * skipped
+    if cutoff is not None and skip_term >= cutoff:
+        return skip_term
+
+    # ลดรูปบน array ที่ decode เตรียมไว้ (schedule จากที่อื่นค่อยแปลงเอง)
+    arr = decoded.get('sched_arr')
+    if arr is None or len(arr) != len(schedule):
+        arr = _schedule_arrays(ctx, schedule)
+    finish = arr['finish_min']
+    makespan_min = float(finish.max() - arr['start_min'].min())
     obj = 0.0
-    obj += w.get('makespan', 1.0) * ((makespan - start0).total_seconds() / 60.0)
-    obj += w.get('tardiness', 10.0) * tardiness_min
-    setup_cost = sum(s.get('setup_min', 0.0) for s in schedule)
-    obj += w.get('setup_cost', 5.0) * setup_cost
-    num_splits_total = sum(int(s.get('splits', 0)) for s in schedule)
-    obj += w.get('preemption_cost', 0.0) * float(num_splits_total)
-    obj += 1e6 * skipped
+    obj += w_make * makespan_min
+    if cutoff is not None and obj + skip_term >= cutoff:
+        return obj + skip_term
+
+    # finish สุดท้ายต่อ order (order ที่ไม่อยู่ใน schedule = -inf → ไม่ล่าช้า)
+    order_idx = arr['order_idx']
+    known = order_idx >= 0
+    last = np.full(len(ctx.order_ids), -np.inf)
+    np.maximum.at(last, order_idx[known], finish[known])
+    tardiness_min = float(np.maximum(last - ctx.due_min_per_order, 0.0).sum())
+    obj += w_tard * tardiness_min
+    if cutoff is not None and obj + skip_term >= cutoff:
+        return obj + skip_term
+
+    setup_cost = float(arr['setup_min'].sum())
+    obj += w_setup * setup_cost
+    num_splits_total = int(arr['splits'].sum())
+    obj += w_pre * float(num_splits_total)
+    obj += skip_term
     return obj
 
 # ============================= GA + Local Search =============================
+# chromosome = permutation ของ index ใน batches (np.int32) — GA แค่สลับลำดับ batch ที่อ่านอย่างเดียว
+# แปลงเป็น list ของ batch dict เฉพาะตอน decode
+
+def chrom_signature(chrom: np.ndarray) -> bytes:
+    # decode ขึ้นกับ ctx + ลำดับ batch เท่านั้น → bytes ของ permutation ใช้เป็น key ของ cache
+    return chrom.tobytes()
+
+def objective(ctx: Context, batches: List[Dict[str, Any]], chrom: np.ndarray,
+              cache: Optional[Dict[bytes, float]] = None, sig: Optional[bytes] = None,
+              cutoff: Optional[float] = None) -> float:
+    # evaluate(decode(...)) จำค่าไว้ต่อ signature ภายใน GA รอบเดียว (cache ใช้ได้กับ ctx/batches ชุดเดียวเท่านั้น)
+    # cutoff: ส่งต่อให้ evaluate ตอน decode จริง — ค่าที่ได้ < cutoff คือค่าจริง (ไม่ถูกตัด) จึงเก็บลง cache ได้
+    #         ค่าที่ถูกตัดเป็นแค่ขอบล่าง ไม่เก็บ (ค่าใน cache ต้องเป็นค่าจริงเสมอ)
+    if cache is None:
+        return evaluate(ctx, decode(ctx, [batches[i] for i in chrom.tolist()]), cutoff)
+    if sig is None:
+        sig = chrom_signature(chrom)
+    obj = cache.get(sig)
+    if obj is None:
+        obj = evaluate(ctx, decode(ctx, [batches[i] for i in chrom.tolist()]), cutoff)
+        if cutoff is None or obj < cutoff:
+            cache[sig] = obj
+    return obj
 
-def random_chromosome(batches: List[Dict[str, Any]]):
-    chrom = deepcopy(batches)
-    random.shuffle(chrom)
-    return chrom
-
-def _chrom_key_item(b):
-    return (b.get('batch_id',''), b['order_id'], b['product_id'], b['qty'],
-            b['release_date'].isoformat(), b['due_date'].isoformat())
-
-def _normalize_chromosome(chrom, ref_pool=None):
-    out = [x for x in chrom if isinstance(x, dict)]
-    if ref_pool is None:
-        return out
-
-    used = set(_chrom_key_item(b) for b in out)
-    for b in ref_pool:
-        k = _chrom_key_item(b)
-        if k not in used:
-            out.append(b)
-            used.add(k)
-    return out
-
-def crossover(p1, p2):
+def random_chromosome(batches: List[Dict[str, Any]]) -> np.ndarray:
+    perm = list(range(len(batches)))
+    random.shuffle(perm)
+    return np.array(perm, dtype=np.int32)
+
+def _normalize_chromosome(chrom, n: int) -> np.ndarray:
+    # เก็บ index ที่อยู่ในช่วง [0, n) ตัวแรกของแต่ละค่าตามลำดับเดิม แล้วต่อท้ายด้วย index ที่หายไป
+    c = np.asarray(chrom, dtype=np.int32)
+    c = c[(c >= 0) & (c < n)]
+    seen = np.zeros(n, dtype=bool)
+    seen[c] = True
+    if len(c) == n and seen.all():
+        return c  # เป็น permutation อยู่แล้ว (กรณีปกติ) — ไม่ต้อง unique/setdiff
+    _, first = np.unique(c, return_index=True)
+    c = c[np.sort(first)]
+    missing = np.setdiff1d(np.arange(n, dtype=np.int32), c, assume_unique=True)
+    return np.concatenate((c, missing)).astype(np.int32, copy=False)
+
+def crossover(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
     n = len(p1)
     if n < 2:
-        return deepcopy(p1)
+        return p1.copy()
 
     a, b = sorted(random.sample(range(n), 2))
-    child = [None] * n
-
-    mid_slice = [deepcopy(x) for x in p1[a:b+1]]
-    child[a:b+1] = mid_slice
-    used = set(_chrom_key_item(x) for x in mid_slice)
-
-    idx = (b + 1) % n
-    for item in p2:
-        k = _chrom_key_item(item)
-        if k in used:
-            continue
-        while child[idx] is not None:
-            idx = (idx + 1) % n
-        child[idx] = deepcopy(item)
-        used.add(k)
-
-    child = _normalize_chromosome(child, ref_pool=p1)
+    child = np.empty(n, dtype=np.int32)
+    child[a:b+1] = p1[a:b+1]
+
+    # OX: ตัวที่เหลือตามลำดับใน p2 เติมหลังช่วงที่คัดลอก แล้ววนกลับไปต้น
+    # (mask ตาม index แทน np.isin — index อยู่ใน [0, n) อยู่แล้ว)
+    taken = np.zeros(n, dtype=bool)
+    taken[p1[a:b+1]] = True
+    rest = p2[~taken[p2]]
+    k = n - (b + 1)
+    child[b+1:] = rest[:k]
+    child[:a] = rest[k:k + a]
     return child
 
-def mutate(chrom, rate=0.2):
-    c = deepcopy(chrom)
-    n = len(c)
-    swaps = max(1, int(rate * n))
-    for _ in range(swaps):
-        i, j = random.randrange(n), random.randrange(n)
+def _apply_swaps(chrom: np.ndarray, ii, jj) -> np.ndarray:
+    # สลับทีละคู่ตามลำดับ (คู่ที่ index ทับกันต้องได้ผลเหมือนสลับทีละครั้ง จึงไม่ทำแบบ fancy index)
+    c = chrom.tolist()
+    for i, j in zip(ii, jj):
         c[i], c[j] = c[j], c[i]
-    return c
-
-def local_search(ctx: Context, chrom, iterations=20, tabu_size=6, temp_start=800):
-    chrom = _normalize_chromosome(chrom)
-
-    best_chrom = deepcopy(chrom)
-    best_obj = evaluate(ctx, decode(ctx, best_chrom))
-    tabu: List[Tuple] = []
-    temp = temp_start
+    return np.array(c, dtype=np.int32)
+
+def mutate(chrom: np.ndarray, rate=0.2, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    rng = rng if rng is not None else np.random.default_rng()
+    swaps = max(1, int(rate * len(chrom)))
+    ii, jj = rng.integers(0, len(chrom), size=(2, swaps)).tolist()
+    return _apply_swaps(chrom, ii, jj)
+
+def local_search(ctx: Context, batches: List[Dict[str, Any]], chrom: np.ndarray, iterations=20, tabu_size=6,
+                 temp_start=800, cache: Optional[Dict[bytes, float]] = None,
+                 rng: Optional[np.random.Generator] = None,
+                 patience: Optional[int] = 5, shared_visited: Optional[frozenset] = None) -> np.ndarray:
+    # patience: หยุดเมื่อไม่เจอ neighbor ที่ดีกว่าติดกันกี่รอบ (None = วนครบ iterations)
+    # shared_visited: signature (bytes) ที่ทั้งรุ่นรู้แล้ว (อ่านอย่างเดียว) — neighbor ที่ตรงกันถือเป็น tabu เหมือนกัน
+    # (ส่งเป็น bytes ไม่ใช่ hash(): hash ของ bytes สุ่มต่อ process เทียบข้าม worker แบบ spawn ไม่ได้)
+    n = len(batches)
+    best_chrom = _normalize_chromosome(chrom, n)
+    best_obj = objective(ctx, batches, best_chrom, cache)
+    if n < 2:
+        return best_chrom
+    # สุ่มทุกอย่างของทั้ง call ครั้งเดียวเป็น array: คู่ swap ของแต่ละรอบ + ค่า -ln(u) ~ Exp(1) สำหรับเกณฑ์รับ
+    rng = rng if rng is not None else np.random.default_rng()
+    swaps = max(1, int(0.3 * n))
+    swap_ij = rng.integers(0, n, size=(iterations, 2, swaps)).tolist()
+    accept_e = rng.standard_exponential(iterations).tolist()
+    # tabu เก็บ hash ของ signature: deque ไว้ไล่ตัวเก่าสุดออก (FIFO) + set ไว้เช็คแบบ O(1)
+    tabu_q: deque = deque()
+    tabu_set: set = set()
+    shared = shared_visited if shared_visited is not None else frozenset()
+    # ตารางอุณหภูมิคำนวณครั้งเดียว (ลด alpha ต่อรอบที่ไม่ติด tabu) — clamp ไว้ล่วงหน้าแทน max() ทุกรอบ
     alpha = 0.95
-    for _ in range(iterations):
-        neighbor = mutate(best_chrom, rate=0.3)
-        neighbor = _normalize_chromosome(neighbor, ref_pool=chrom)
+    temps = [float(temp_start)] * max(iterations, 1)
+    for k in range(1, iterations):
+        temps[k] = temps[k - 1] * alpha
+    temps = [max(t, 1e-9) for t in temps]
+    k = 0
+    since_improve = 0
+    for it in range(iterations):
+        if patience is not None and since_improve >= patience:
+            break
+        since_improve += 1
+        neighbor = _apply_swaps(best_chrom, *swap_ij[it])  # สลับตำแหน่งอย่างเดียว ยังเป็น permutation
 
-        sig = tuple((x.get('batch_id',''), x['order_id'], x['product_id'], x['qty']) for x in neighbor)
-        if sig in tabu:
+        sig = chrom_signature(neighbor)
+        sig_hash = hash(sig)
+        if sig_hash in tabu_set or sig in shared:
             continue
-        obj = evaluate(ctx, decode(ctx, neighbor))
+        # รับ neighbor เมื่อ delta < 0 หรือ u < exp(-delta/T) ⇔ obj < best_obj - T·ln(u) = best_obj + T·e
+        # → สุ่มไว้ก่อนแล้วใช้เกณฑ์นี้เป็น cutoff ของ evaluate ได้
+        threshold = best_obj + temps[k] * accept_e[it]
+        obj = objective(ctx, batches, neighbor, cache, sig, cutoff=threshold)
         delta = obj - best_obj
-        if delta < 0 or random.random() < math.exp(-delta / max(temp, 1e-9)):
+        if delta < 0:
+            since_improve = 0
+        if obj < threshold:
             best_chrom = neighbor
             best_obj = obj
-            tabu.append(sig)
-            if len(tabu) > tabu_size:
-                tabu.pop(0)
-        temp *= alpha
+            if tabu_size > 0:
+                if len(tabu_q) == tabu_size:
+                    tabu_set.discard(tabu_q.popleft())
+                tabu_q.append(sig_hash)
+                tabu_set.add(sig_hash)
+        k += 1
     return best_chrom
 
-def ga_scheduler(ctx: Context, batches, population=18, generations=12):
-    pop = [_normalize_chromosome(random_chromosome(batches), ref_pool=batches) for _ in range(population)]
-    best_chrom = pop[0]
-    best_obj = evaluate(ctx, decode(ctx, best_chrom))
-
-    for gen in range(generations):
-        new_pop = []
-        for _ in range(population):
-            p1, p2 = random.sample(pop, 2)
-            child = crossover(p1, p2)
-            child = mutate(child)
-            child = _normalize_chromosome(child, ref_pool=batches)
-            child = local_search(ctx, child, iterations=20, tabu_size=6)
-            new_pop.append(child)
-
-        for chrom in new_pop:
-            obj = evaluate(ctx, decode(ctx, chrom))
-            if obj < best_obj:
-                best_chrom = chrom
-                best_obj = obj
-        pop = new_pop
-        print(f"Generation {gen+1}/{generations}, best_obj={best_obj:.2f}")
-
-    decoded = decode(ctx, best_chrom)
+# ---- ฝั่ง worker: แต่ละ process เก็บ ctx/batches/cache ของตัวเอง ตั้งครั้งเดียวตอนสร้าง pool ----
+_W_CTX: Optional[Context] = None
+_W_BATCHES: List[Dict[str, Any]] = []
+_W_CACHE: Dict[bytes, float] = {}
+
+def _init_worker(ctx: Context, batches):
+    global _W_CTX, _W_BATCHES, _W_CACHE
+    _W_CTX, _W_BATCHES, _W_CACHE = ctx, batches, {}
+
+def _ls_and_eval(task):
+    # (perm, seed, iterations, shared_visited) -> (perm หลัง local search, objective)
+    perm, seed, iters, shared = task
+    best = local_search(_W_CTX, _W_BATCHES, perm, iterations=iters, tabu_size=6, cache=_W_CACHE,
+                        rng=np.random.default_rng(seed), shared_visited=shared)
+    return best, objective(_W_CTX, _W_BATCHES, best, _W_CACHE)
+
+def ga_scheduler(ctx: Context, batches, population=18, generations=12, n_workers: Optional[int] = None,
+                 patience: Optional[int] = 5):
+    """n_workers: จำนวน process สำหรับ local search + evaluate ของลูก (None = os.cpu_count(), 1 = ทำใน process เดียว)
+       ลูกแต่ละตัวได้ RNG ที่ seed แยก → ผลไม่ขึ้นกับจำนวน worker
+       ประชากรรุ่นถัดไป = ดีที่สุด population ตัวจาก (พ่อแม่ + ลูก) โดยใช้ objective เดิมที่รู้แล้ว (elitism)
+       patience: หยุดก่อนครบ generations ถ้า best ไม่ดีขึ้นติดกันกี่รุ่น (None = ไม่หยุดก่อน)
+    """
+    n = len(batches)
+    cache: Dict[bytes, float] = {}  # signature -> objective ของรอบนี้ (chromosome ซ้ำไม่ต้อง decode ใหม่)
+    pop = [_normalize_chromosome(random_chromosome(batches), n) for _ in range(population)]
+    pop_with_obj: List[Tuple[np.ndarray, float]] = [(c, objective(ctx, batches, c, cache)) for c in pop]
+    best_chrom, best_obj = min(pop_with_obj, key=itemgetter(1))
+    np_rng = np.random.default_rng(random.getrandbits(64))  # seed จาก random → random.seed() ยังคุมผลได้ทั้งหมด
+
+    n_workers = n_workers or os.cpu_count() or 1
+    executor = None
+    if n_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(ctx, batches))
+
+    since_improve = 0
+    try:
+        for gen in range(generations):
+            pop = [c for c, _ in pop_with_obj]
+            children = []
+            for _ in range(population):
+                p1, p2 = random.sample(pop, 2)
+                child = crossover(p1, p2)
+                children.append(mutate(child, rng=np_rng))  # OX + swap ได้ permutation เสมอ ไม่ต้อง normalize
+            seeds = [random.getrandbits(64) for _ in children]
+            # รุ่นแรก ๆ ค้นกว้าง รุ่นหลังลดรอบ local search ลง
+            iters = max(5, int(20 * (1 - gen / generations)))
+            # tabu ร่วมของรุ่นนี้ = signature ของประชากรปัจจุบัน (ลูกทุกตัวเห็นชุดเดียวกัน → ผลไม่ขึ้นกับจำนวน worker)
+            shared = frozenset(chrom_signature(c) for c in pop)
+
+            new_with_obj = []
+            if executor is not None:
+                tasks = [(c, sd, iters, shared) for c, sd in zip(children, seeds)]
+                for chrom, obj in executor.map(_ls_and_eval, tasks, chunksize=max(1, len(tasks) // (4 * n_workers))):
+                    cache[chrom_signature(chrom)] = obj
+                    new_with_obj.append((chrom, obj))
+            else:
+                for c, sd in zip(children, seeds):
+                    chrom = local_search(ctx, batches, c, iterations=iters, tabu_size=6, cache=cache,
+                                         rng=np.random.default_rng(sd), shared_visited=shared)
+                    new_with_obj.append((chrom, objective(ctx, batches, chrom, cache)))
+
+            combined = pop_with_obj + new_with_obj
+            combined.sort(key=itemgetter(1))
+            pop_with_obj = combined[:population]
+
+            if combined[0][1] < best_obj:
+                best_chrom, best_obj = combined[0]
+                since_improve = 0
+            else:
+                since_improve += 1
+            print(f"Generation {gen+1}/{generations}, best_obj={best_obj:.2f}")
+            if patience is not None and since_improve >= patience:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    decoded = decode(ctx, [batches[i] for i in best_chrom.tolist()])
     return decoded
 
 # ============================= Printing helpers =============================
 
-def to_printable_row(s: Dict[str, Any]):
-    return {
-        "batch_id": s.get('batch_id', ''),
-        "order_id": s['order_id'],
-        "product_id": s['product_id'],
-        "routing_id": s.get('routing_id', ''),
-        "operation": s['operation'],
-        "qty": s['qty'],
-        "machine": s['machine'],
-        "start": s['start'].strftime("%Y-%m-%d %H:%M"),
-        "finish": s['finish'].strftime("%Y-%m-%d %H:%M"),
-        "setup_min": round(s.get('setup_min', 0.0), 2),
-        "proc_min": round(s.get('proc_min', 0.0), 2),
-        "splits": int(s.get('splits', 0)),
-    }
+PRINT_HEADERS = ("batch_id", "order_id", "product_id", "routing_id", "operation", "qty", "machine",
+                 "start", "finish", "setup_min", "proc_min", "splits")
+# ตารางรายเครื่อง: ไม่มีคอลัมน์ machine แต่ต่อท้ายด้วย duration_min
+MACHINE_HEADERS = tuple(h for h in PRINT_HEADERS if h != "machine") + ("duration_min",)
+_machine_cols = itemgetter(*(PRINT_HEADERS.index(h) for h in MACHINE_HEADERS[:-1]))
+
+def to_printable_row(s: Dict[str, Any]) -> tuple:
+    # tuple ตามลำดับ PRINT_HEADERS → ส่งเข้า csv.writer ได้ตรง ๆ
+    return (
+        s.get('batch_id', ''),
+        s['order_id'],
+        s['product_id'],
+        s.get('routing_id', ''),
+        s['operation'],
+        s['qty'],
+        s['machine'],
+        s['start'].strftime("%Y-%m-%d %H:%M"),
+        s['finish'].strftime("%Y-%m-%d %H:%M"),
+        round(s.get('setup_min', 0.0), 2),
+        round(s.get('proc_min', 0.0), 2),
+        int(s.get('splits', 0)),
+    )
 
 # ============================= Main =============================
 if __name__ == "__main__":
@@ -973,56 +1326,47 @@ if __name__ == "__main__":
     fail_stats = decoded.get('fail_stats', {})
     skipped = decoded.get('skipped', 0)
 
+    # เขียนแถวทีละแถวผ่าน csv.writer (ไม่สร้าง list/dict ของแถวที่พิมพ์ไว้ก่อน)
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+
     print("\n=== FINAL SCHEDULE (console only) ===")
-    printable = [to_printable_row(r) for r in final_schedule]
-    if printable:
-        headers = list(printable[0].keys())
-        print(",".join(headers))
-        for r in printable:
-            print(",".join(str(r[h]) for h in headers))
+    if final_schedule:
+        writer.writerow(PRINT_HEADERS)
+        writer.writerows(map(to_printable_row, final_schedule))
     else:
         print("(empty)")
 
-    # Group by machine
+    # Group by machine: เก็บแถวเดิม (start/finish เป็น datetime) แล้วเรียงตาม start ครั้งเดียว
     by_machine: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
     for r in final_schedule:
-        dur_min = r.get("setup_min", 0.0) + r.get("proc_min", 0.0)
-        by_machine[r["machine"]].append({
-            "batch_id": r.get("batch_id",""),
-            "order_id": r["order_id"],
-            "product_id": r["product_id"],
-            "routing_id": r.get("routing_id",""),
-            "operation": r["operation"],
-            "qty": r["qty"],
-            "start": r["start"].strftime("%Y-%m-%d %H:%M"),
-            "finish": r["finish"].strftime("%Y-%m-%d %H:%M"),
-            "setup_min": round(r.get("setup_min", 0.0), 2),
-            "proc_min": round(r.get("proc_min", 0.0), 2),
-            "splits": int(r.get("splits", 0)),
-            "duration_min": round(dur_min, 2)
-        })
+        by_machine[r["machine"]].append(r)
+    for rows in by_machine.values():
+        rows.sort(key=itemgetter("start"))
 
     print("\n=== MACHINE SCHEDULES (console only) ===")
-    def _p(ts: str):
-        return dt.datetime.strptime(ts, "%Y-%m-%d %H:%M")
-
     for m_id, rows in sorted(by_machine.items()):
-        rows.sort(key=lambda x: _p(x["start"]))
         print(f"\n--- Machine: {m_id} ---")
-        header = ["batch_id","order_id","product_id","routing_id","operation","qty","start","finish","setup_min","proc_min","splits","duration_min"]
-        print(",".join(header))
-        for r in rows:
-            print(",".join(str(r[h]) for h in header))
+        writer.writerow(MACHINE_HEADERS)
+        writer.writerows(_machine_cols(to_printable_row(r)) + (round(r.get("setup_min", 0.0) + r.get("proc_min", 0.0), 2),)
+                         for r in rows)
 
     print("\n=== MACHINE UTILIZATION (rough; console only) ===")
+    sched_arr = decoded.get('sched_arr')
+    if sched_arr is None or len(sched_arr) != len(final_schedule):
+        sched_arr = _schedule_arrays(ctx, final_schedule)
+    known = sched_arr['machine_idx'] >= 0
+    busy_by_idx = np.bincount(sched_arr['machine_idx'][known],
+                              weights=(sched_arr['setup_min'] + sched_arr['proc_min'])[known],
+                              minlength=len(ctx.machine_ids))
     for m_id, rows in sorted(by_machine.items()):
-        rows_sorted = sorted(rows, key=lambda x: _p(x["start"]))
-        if not rows_sorted:
-            continue
-        first_start = _p(rows_sorted[0]["start"])
-        last_finish = _p(rows_sorted[-1]["finish"])
+        first_start = rows[0]["start"]
+        last_finish = rows[-1]["finish"]
         horizon_min = max((last_finish - first_start).total_seconds()/60.0, 1e-9)
-        busy_min = sum(r["duration_min"] for r in rows_sorted)
+        m_idx = ctx.machine_index.get(m_id, -1)
+        if m_idx >= 0:
+            busy_min = float(busy_by_idx[m_idx])
+        else:
+            busy_min = sum(r.get("setup_min", 0.0) + r.get("proc_min", 0.0) for r in rows)
         busy_min = min(busy_min, horizon_min)
         util = (busy_min / horizon_min)
         print(f"{m_id}: busy={busy_min:.1f} min, horizon={horizon_min:.1f} min, util={util*100:.1f}%")